@@ -0,0 +1,358 @@
+# HTTP/JSON front end for AsyncHotelService, one process serves all clients instead of every client opening the
+# SQLite file itself. Plain asyncio streams: HTTP/1.1 with keep-alive, gzip compressed responses and single-flight
+# for identical concurrent availability queries.
+#
+#   GET    /hotels?q=text&limit=20             full text search (without q: all hotels, offset/limit)
+#   GET    /hotels/<id>                        hotel with rooms
+#   GET    /availability?city=..&start=YYYY-MM-DD&end=YYYY-MM-DD[&guests=1][&max_price=..][&amenities=TV,Minibar]
+#   POST   /bookings                           {"guest_id", "hotel_id", "room_number", "start_date", "end_date",
+#                                               "number_of_guests", "comment"}
+#   DELETE /bookings/<id>
+#   GET    /stats                              reservation metrics, single-flight and connection pool counters
+#   GET    /metrics                            query statistics in the Prometheus text format (see query_stats)
+import asyncio
+import gzip
+import json
+import logging
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from business.AsyncHotelService import AsyncHotelService
+from business.ReservationManager import RoomNotAvailableError
+from business.SearchManager import SearchCriteria
+from data_access.amenities import parse_amenities
+from data_access.catalogue_cache import AddressSnapshot, HotelSnapshot, RoomSnapshot
+from data_access.engine_factory import pool_statistics
+from data_access.projections import AddressView, HotelView, RoomView
+from data_access.query_stats import entry_point, query_stats
+from data_models.models import *
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_LINES = 100
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str | None = None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class HttpRequest(object):
+    def __init__(self, method: str, target: str, version: str, headers: dict[str, str], body: bytes):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path.rstrip("/") or "/"
+        self.query = dict(parse_qsl(url.query))
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def accepts_gzip(self) -> bool:
+        return "gzip" in self.headers.get("accept-encoding", "")
+
+    def json(self) -> dict:
+        try:
+            document = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+        if not isinstance(document, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+        return document
+
+
+class JsonResponse(object):
+    '''
+    Encoded response body. Responses shared by single-flight are encoded and compressed only once.
+    '''
+    content_type = "application/json; charset=utf-8"
+
+    def __init__(self, document, status: HTTPStatus = HTTPStatus.OK):
+        self.status = status
+        self.body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode()
+        self._gzipped = None
+
+    def payload(self, gzipped: bool) -> bytes:
+        if not gzipped:
+            return self.body
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+
+class TextResponse(JsonResponse):
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, text: str, status: HTTPStatus = HTTPStatus.OK):
+        self.status = status
+        self.body = text.encode()
+        self._gzipped = None
+
+
+class SingleFlight(object):
+    '''
+    Concurrent calls with the same key share one execution: the first caller runs it, the others wait for its
+    result. Nothing is kept after the call has finished, so there is no stale data as with a cache.
+    '''
+
+    def __init__(self):
+        self._calls: dict[object, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, function):
+        future = self._calls.get(key)
+        if future is None:
+            self.calls += 1
+            future = self._calls[key] = asyncio.ensure_future(function())
+            future.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.shared += 1
+        # a cancelled waiter (client gone) must not cancel the call of the others
+        return await asyncio.shield(future)
+
+    def as_dict(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+class BookingHttpService(object):
+    def __init__(self, service: AsyncHotelService, engine=None, keep_alive_timeout: float = 15.0,
+                 compress_min_size: int = 512):
+        self._service = service
+        self._engine = engine
+        self._keep_alive_timeout = keep_alive_timeout
+        self._compress_min_size = compress_min_size
+        self._availability = SingleFlight()
+        self.requests = 0
+        self.connections = 0
+        self._server: asyncio.Server | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.Server:
+        self._server = await asyncio.start_server(self._handle_connection, host, port, backlog=1024)
+        return self._server
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8080):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self._keep_alive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except HttpError as err:
+                    await self._write(writer, JsonResponse({"error": str(err)}, err.status), False, False)
+                    return
+                if request is None:
+                    return
+                self.requests += 1
+                response = await self._dispatch(request)
+                keep_alive = request.keep_alive()
+                await self._write(writer, response, request.accepts_gzip(), keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> HttpRequest | None:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length < 0:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b""
+        return HttpRequest(method.upper(), target, version, headers, body)
+
+    async def _write(self, writer: asyncio.StreamWriter, response: JsonResponse, accepts_gzip: bool,
+                     keep_alive: bool):
+        gzipped = accepts_gzip and len(response.body) >= self._compress_min_size
+        payload = response.payload(gzipped)
+        head = [f"HTTP/1.1 {response.status.value} {response.status.phrase}",
+                f"Content-Type: {response.content_type}",
+                f"Content-Length: {len(payload)}",
+                "Vary: Accept-Encoding",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if gzipped:
+            head.append("Content-Encoding: gzip")
+        if keep_alive:
+            head.append(f"Keep-Alive: timeout={int(self._keep_alive_timeout)}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    async def _dispatch(self, request: HttpRequest) -> JsonResponse:
+        parts = request.path.strip("/").split("/")
+        try:
+            with entry_point(f"{request.method} /{parts[0]}"):
+                return await self._route(request, parts)
+        except HttpError as err:
+            return JsonResponse({"error": str(err)}, err.status)
+        except RoomNotAvailableError as err:
+            return JsonResponse({"error": str(err)}, HTTPStatus.CONFLICT)
+        except ValueError as err:
+            return JsonResponse({"error": str(err)}, HTTPStatus.BAD_REQUEST)
+        except Exception:
+            # e.g. an OperationalError once the lock retries are used up; the client gets an answer and the
+            # connection stays usable
+            logger.exception("%s %s failed", request.method, request.path)
+            return JsonResponse({"error": "Internal server error"}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    async def _route(self, request: HttpRequest, parts: List[str]) -> JsonResponse:
+        match request.method, parts:
+            case "GET", ["hotels"]:
+                return await self._get_hotels(request)
+            case "GET", ["hotels", hotel_id]:
+                return await self._get_hotel(self._int(hotel_id, "hotel id"))
+            case "GET", ["availability"]:
+                return await self._get_availability(request)
+            case "POST", ["bookings"]:
+                return await self._post_booking(request)
+            case "DELETE", ["bookings", booking_id]:
+                return await self._delete_booking(self._int(booking_id, "booking id"))
+            case "GET", ["stats"]:
+                return JsonResponse(self._stats())
+            case "GET", ["metrics"]:
+                return TextResponse(query_stats.prometheus())
+            case _, ["hotels" | "availability" | "bookings" | "stats" | "metrics", *_]:
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED)
+            case _:
+                raise HttpError(HTTPStatus.NOT_FOUND)
+
+    async def _get_hotels(self, request: HttpRequest) -> JsonResponse:
+        limit = self._int(request.query.get("limit", "20"), "limit")
+        if request.query.get("q"):
+            hotels = await self._service.search_hotels(request.query["q"], limit)
+        else:
+            hotels = await self._service.get_hotel_views(self._int(request.query.get("offset", "0"), "offset"),
+                                                         limit)
+        return JsonResponse([hotel_to_dict(hotel) for hotel in hotels])
+
+    async def _get_hotel(self, hotel_id: int) -> JsonResponse:
+        hotel = await self._service.get_hotel(hotel_id)
+        if hotel is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Hotel {hotel_id} does not exist")
+        document = hotel_to_dict(hotel)
+        document["rooms"] = [room_to_dict(room) for room in hotel.rooms]
+        return JsonResponse(document)
+
+    async def _get_availability(self, request: HttpRequest) -> JsonResponse:
+        query = request.query
+        if not query.get("city"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Parameter city is required")
+        criteria = SearchCriteria(
+            query["city"], self._date(query.get("start"), "start"), self._date(query.get("end"), "end"),
+            self._int(query.get("guests", "1"), "guests"),
+            self._float(query["max_price"], "max_price") if query.get("max_price") else None,
+            parse_amenities(query.get("amenities")),
+        )
+        if criteria.end_date <= criteria.start_date:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "end must be after start")
+        key = (criteria.city, criteria.start_date, criteria.end_date, criteria.number_of_guests, criteria.max_price,
+               tuple(sorted(name.lower() for name in criteria.amenities)))
+
+        async def search() -> JsonResponse:
+            rooms = await self._service.find_available_room_views(criteria)
+            return JsonResponse([room_to_dict(room, with_hotel=True) for room in rooms])
+
+        return await self._availability.do(key, search)
+
+    async def _post_booking(self, request: HttpRequest) -> JsonResponse:
+        document = request.json()
+        try:
+            booking = await self._service.make_reservation(
+                self._int(document["guest_id"], "guest_id"), self._int(document["hotel_id"], "hotel_id"),
+                str(document["room_number"]), self._date(document["start_date"], "start_date"),
+                self._date(document["end_date"], "end_date"),
+                self._int(document.get("number_of_guests", 1), "number_of_guests"), document.get("comment"))
+        except KeyError as err:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Field {err.args[0]} is required")
+        return JsonResponse(booking_to_dict(booking), HTTPStatus.CREATED)
+
+    async def _delete_booking(self, booking_id: int) -> JsonResponse:
+        if not await self._service.cancel_reservation(booking_id):
+            raise HttpError(HTTPStatus.NOT_FOUND, f"Booking {booking_id} does not exist")
+        return JsonResponse({"id": booking_id, "cancelled": True})
+
+    def _stats(self) -> dict:
+        stats = {"requests": self.requests, "connections": self.connections,
+                 "reservations": self._service.metrics.as_dict(), "availability": self._availability.as_dict()}
+        if self._engine is not None:
+            stats["pool"] = pool_statistics(self._engine)
+        return stats
+
+    @staticmethod
+    def _int(value, name: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+
+    @staticmethod
+    def _float(value, name: str) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be a number")
+
+    @staticmethod
+    def _date(value, name: str) -> date:
+        try:
+            return date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be a date (YYYY-MM-DD)")
+
+
+def address_to_dict(address: Address | AddressView | AddressSnapshot) -> dict:
+    return {"street": address.street, "zip": address.zip, "city": address.city}
+
+
+def hotel_to_dict(hotel: Hotel | HotelView | HotelSnapshot) -> dict:
+    return {"id": hotel.id, "name": hotel.name, "stars": hotel.stars, "address": address_to_dict(hotel.address)}
+
+
+def room_to_dict(room: Room | RoomView | RoomSnapshot, with_hotel: bool = False) -> dict:
+    document = {"hotel_id": room.hotel_id, "number": room.number, "type": room.type, "max_guests": room.max_guests,
+                "description": room.description, "amenities": room.amenities, "price": room.price}
+    if with_hotel:
+        document["hotel"] = hotel_to_dict(room.hotel)
+    return document
+
+
+def booking_to_dict(booking: Booking) -> dict:
+    return {"id": booking.id, "guest_id": booking.guest_id, "hotel_id": booking.room_hotel_id,
+            "room_number": booking.room_number, "number_of_guests": booking.number_of_guests,
+            "start_date": booking.start_date.isoformat(), "end_date": booking.end_date.isoformat(),
+            "comment": booking.comment}
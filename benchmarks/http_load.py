@@ -0,0 +1,143 @@
+# load generator for main_http_service.py, every client thread keeps one keep-alive connection open
+# run from the project root: python -m benchmarks.http_load --clients 32 --duration 10
+# the mix of availability queries is drawn from few cities and dates, so identical queries run concurrently
+import argparse
+import gzip
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+
+class LoadClient(threading.Thread):
+    def __init__(self, number: int, args: argparse.Namespace, cities: list[str], deadline: float):
+        super().__init__(daemon=True)
+        self._args = args
+        self._cities = cities
+        self._deadline = deadline
+        self._random = random.Random(f"{args.seed}:{number}")
+        self._rooms: list[dict] = []
+        self.latencies: dict[str, list[float]] = {"hotels": [], "availability": [], "booking": []}
+        self.statuses = Counter()
+        self.bytes = 0
+
+    def run(self):
+        connection = http.client.HTTPConnection(self._args.host, self._args.port, timeout=30)
+        while time.perf_counter() < self._deadline:
+            kind = self._random.choices(["hotels", "availability", "booking"],
+                                        [self._args.search, self._args.availability, self._args.booking])[0]
+            if kind == "booking" and not self._rooms:
+                kind = "availability"
+            method, path, body = getattr(self, f"_{kind}")()
+            started = time.perf_counter()
+            try:
+                status, document = self._request(connection, method, path, body)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(self._args.host, self._args.port, timeout=30)
+                self.statuses["error"] += 1
+                continue
+            self.latencies[kind].append(time.perf_counter() - started)
+            self.statuses[status] += 1
+            if kind == "availability" and status == 200 and document:
+                self._rooms = document
+        connection.close()
+
+    def _request(self, connection: http.client.HTTPConnection, method: str, path: str, body: dict | None):
+        headers = {"Accept-Encoding": "gzip"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(body)
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        payload = response.read()
+        self.bytes += len(payload)
+        if response.getheader("Content-Encoding") == "gzip":
+            payload = gzip.decompress(payload)
+        return response.status, json.loads(payload) if payload else None
+
+    def _hotels(self):
+        return "GET", "/hotels?" + urlencode({"q": self._random.choice(self._cities), "limit": 20}), None
+
+    def _availability(self):
+        start = self._start_date()
+        end = start + timedelta(days=self._random.randint(1, 7))
+        return "GET", "/availability?" + urlencode({"city": self._random.choice(self._cities), "start": start,
+                                                     "end": end}), None
+
+    def _booking(self):
+        room = self._random.choice(self._rooms)
+        start = self._start_date() + timedelta(days=self._random.randrange(self._args.days))
+        return "POST", "/bookings", {"guest_id": self._random.randint(1, self._args.guests),
+                                     "hotel_id": room["hotel_id"], "room_number": room["number"],
+                                     "start_date": start.isoformat(),
+                                     "end_date": (start + timedelta(days=self._random.randint(1, 7))).isoformat()}
+
+    def _start_date(self) -> date:
+        # few distinct dates, so concurrent clients ask the same availability queries
+        return self._args.start + timedelta(days=7 * self._random.randrange(self._args.weeks))
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def fetch_cities(host: str, port: int) -> list[str]:
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request("GET", "/hotels?limit=1000")
+    cities = sorted({hotel["address"]["city"] for hotel in json.loads(connection.getresponse().read())})
+    connection.close()
+    return cities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="load generator for the HTTP booking service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--search", type=float, default=1.0, help="weight of full text searches")
+    parser.add_argument("--availability", type=float, default=8.0, help="weight of availability queries")
+    parser.add_argument("--booking", type=float, default=1.0, help="weight of bookings")
+    parser.add_argument("--guests", type=int, default=1, help="bookings use guest ids 1..guests")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today() + timedelta(days=30))
+    parser.add_argument("--weeks", type=int, default=4, help="number of distinct availability start dates")
+    parser.add_argument("--days", type=int, default=365, help="bookings start within this many days")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    cities = fetch_cities(args.host, args.port)
+    if not cities:
+        parser.error("the service has no hotels")
+    deadline = time.perf_counter() + args.duration
+    clients = [LoadClient(number, args, cities, deadline) for number in range(args.clients)]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    statuses = sum((client.statuses for client in clients), Counter())
+    total = sum(statuses.values())
+    print(f"{total} requests in {elapsed:.1f}s with {args.clients} clients: {total / elapsed:.0f} requests/s, "
+          f"{sum(client.bytes for client in clients) / total / 1024 if total else 0:.1f} KiB/response")
+    print("status codes:", dict(sorted(statuses.items(), key=str)))
+    for kind in ("hotels", "availability", "booking"):
+        latencies = [latency for client in clients for latency in client.latencies[kind]]
+        if latencies:
+            print(f"{kind:<13} {len(latencies):>8}  median {statistics.median(latencies) * 1000:7.1f}ms  "
+                  f"p95 {percentile(latencies, 0.95) * 1000:7.1f}ms  p99 {percentile(latencies, 0.99) * 1000:7.1f}ms")
+    connection = http.client.HTTPConnection(args.host, args.port, timeout=30)
+    connection.request("GET", "/stats")
+    print("server:", connection.getresponse().read().decode())
+
+
+if __name__ == '__main__':
+    main()
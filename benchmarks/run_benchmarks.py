@@ -0,0 +1,222 @@
+# benchmarks for the data access layer and the search/listing paths
+# run from the project root: python -m benchmarks.run_benchmarks --sizes 1000 100000 --output results.json
+# compare with an earlier run: python -m benchmarks.run_benchmarks --compare results.json
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from data_access.catalogue_cache import catalogue_cache
+from data_access.data_base import init_db
+from data_access.data_generator import generate_system_data, generate_hotels, generate_guests, \
+    generate_registered_guests, generate_random_bookings, generate_random_registered_bookings
+from data_access.engine_factory import get_engine
+from data_access.load_test_generator import LoadTestDataset
+from main_hotel_mgn import HotelManager
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+class Benchmark(object):
+    def __init__(self, name: str, size: int, timings: list[float]):
+        self.name = name
+        self.size = size
+        self.timings = timings
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "size": self.size,
+            "repeat": len(self.timings),
+            "min": min(self.timings),
+            "median": statistics.median(self.timings),
+            "max": max(self.timings),
+        }
+
+    def __repr__(self) -> str:
+        return f"{self.name:<40} {self.size:>10} rows  min {min(self.timings):9.4f}s  median {statistics.median(self.timings):9.4f}s"
+
+
+def measure(function, repeat: int, setup=None) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def dataset_for(size: int) -> LoadTestDataset:
+    # size is the number of bookings, the other tables grow with it
+    return LoadTestDataset(hotels=max(10, size // 100), rooms_per_hotel=10, guests=max(10, size // 10),
+                           bookings=size, seed=1)
+
+
+@contextlib.contextmanager
+def quiet_console():
+    # HotelManager prints every hotel and waits for Enter
+    original_input = builtins.input
+    builtins.input = lambda prompt="": ""
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = original_input
+
+
+def benchmark_init_db(workdir: Path, repeat: int) -> list[Benchmark]:
+    db_file = workdir.joinpath("init_db.db")
+    results = [Benchmark("init_db", 0, measure(lambda: init_db(str(db_file), reset=True), repeat)),
+               Benchmark("init_db (warm start)", 0, measure(lambda: init_db(str(db_file)), repeat))]
+    engine = get_engine(str(db_file))
+    generators = [
+        ("generate_system_data", generate_system_data),
+        ("generate_hotels", generate_hotels),
+        ("generate_guests", generate_guests),
+        ("generate_registered_guests", generate_registered_guests),
+        ("generate_random_bookings", generate_random_bookings),
+        ("generate_random_registered_bookings", generate_random_registered_bookings),
+    ]
+    timings = {name: [] for name, _ in generators}
+    for _ in range(repeat):
+        init_db(str(db_file), reset=True)
+        for name, generator in generators:
+            started = time.perf_counter()
+            generator(engine, verbose=False)
+            timings[name].append(time.perf_counter() - started)
+    engine.dispose()
+    results.extend(Benchmark(name, 0, timings[name]) for name, _ in generators)
+    return results
+
+
+def benchmark_size(workdir: Path, size: int, repeat: int) -> list[Benchmark]:
+    db_file = workdir.joinpath(f"bench_{size}.db")
+    dataset = dataset_for(size)
+    results = []
+
+    def build():
+        init_db(str(db_file), reset=True)
+        dataset.write_sqlite(get_engine(str(db_file)))
+
+    # the full dataset is only written once, it is reused by the read benchmarks
+    results.append(Benchmark("LoadTestDataset.write_sqlite", size, measure(build, 1)))
+
+    engine = get_engine(str(db_file))
+    hotel_manager = HotelManager(sessionmaker(bind=engine))
+
+    def show_all_hotels():
+        # measures loading the catalogue, not hits of the process-wide cache
+        catalogue_cache.invalidate()
+        with quiet_console():
+            hotel_manager.show_all_hotels()
+        hotel_manager._session.remove()
+
+    results.append(Benchmark("HotelManager.show_all_hotels", size, measure(show_all_hotels, repeat)))
+    results.extend(benchmark_hotel_table_model(engine, size, repeat))
+    engine.dispose()
+    return results
+
+
+def benchmark_hotel_table_model(engine, size: int, repeat: int) -> list[Benchmark]:
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtWidgets import QApplication
+        from gui.hotel_table_model import HotelTableModel
+    except ImportError:
+        print("PyQt5 is not installed, skipping HotelTableModel benchmarks", file=sys.stderr)
+        return []
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    results = []
+    with Session(engine) as session:
+        model = HotelTableModel(None, session)
+
+        def paint():
+            # what a view does when it shows the first screen pages
+            for row in range(min(model.rowCount(), 1000)):
+                for column in range(model.columnCount()):
+                    model.data(model.index(row, column), Qt.DisplayRole)
+
+        results.append(Benchmark("HotelTableModel.all", size, measure(model.all, repeat, session.expunge_all)))
+
+        def reload():
+            session.expunge_all()
+            model.all()
+
+        results.append(Benchmark("HotelTableModel.data (1000 rows)", size, measure(paint, repeat, reload)))
+        results.append(Benchmark("HotelTableModel.search_name", size,
+                                 measure(lambda: model.search_name("hotel sonne"), repeat, session.expunge_all)))
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    previous = {(result["name"], result["size"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results["results"]:
+        before = previous.get((result["name"], result["size"]))
+        if before is None or before["median"] <= 0:
+            continue
+        change = result["median"] / before["median"] - 1
+        line = f"{result['name']:<40} {result['size']:>10}  {before['median']:9.4f}s -> {result['median']:9.4f}s  {change:+.0%}"
+        print(line)
+        if change > threshold:
+            regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data access layer and the search paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="number of bookings")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workdir", help="directory for the benchmark databases (default: temporary)")
+    parser.add_argument("--output", default=f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument("--compare", help="earlier result file, slower medians are reported as regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        workdir = Path(args.workdir) if args.workdir else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        workdir.mkdir(parents=True, exist_ok=True)
+        benchmarks = benchmark_init_db(workdir, args.repeat)
+        for size in args.sizes:
+            benchmarks.extend(benchmark_size(workdir, size, args.repeat))
+
+    for benchmark in benchmarks:
+        print(benchmark)
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": args.sizes,
+        "repeat": args.repeat,
+        "results": [benchmark.as_dict() for benchmark in benchmarks],
+    }
+    with open(args.output, "w") as result_file:
+        json.dump(results, result_file, indent=2)
+    print("Results written to", args.output)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for line in regressions:
+                print(line)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# asyncio service layer for API front ends: search, availability, bookings and hotel CRUD as coroutines
+# all queries are shared with the synchronous managers, only the session handling differs
+import asyncio
+import random
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import joinedload, selectinload
+
+from business.ReservationManager import ReservationMetrics, RoomNotAvailableError, is_locked_error, overlapping_booking
+from business.SearchManager import SearchCriteria, available_rooms_query
+from data_access.amenities import amenity_catalog
+from data_access.catalogue_cache import HotelSnapshot, catalogue_cache
+from data_access.engine_factory import sqlite_transactions_enabled
+from data_access.fulltext import ranked_hotels_query
+from data_access.projections import Projector, RoomView, rooms_query
+from data_models.models import *
+
+# lazy loading is not possible with AsyncSession, everything the __repr__ of the results touches is loaded eagerly
+_HOTEL_LOADS = (joinedload(Hotel.address),)
+_BOOKING_LOADS = (
+    joinedload(Booking.room).joinedload(Room.hotel).joinedload(Hotel.address),
+    joinedload(Booking.guest).joinedload(Guest.address),
+)
+
+
+class AsyncHotelService(object):
+    '''
+    Serves many concurrent requests in one event loop. Every coroutine uses its own short AsyncSession, so
+    requests only wait for a pooled connection and never for each other. The returned objects are detached
+    from their session and have all attributes of their __repr__ loaded.
+    '''
+
+    def __init__(self, engine: AsyncEngine, max_retries: int = 8, backoff: float = 0.005, max_backoff: float = 0.5):
+        if not sqlite_transactions_enabled(engine.sync_engine):
+            raise ValueError("the engine has to come from data_access.engine_factory, "
+                             "other engines cannot start BEGIN IMMEDIATE transactions")
+        self._sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self._write_sessions = async_sessionmaker(engine.execution_options(sqlite_immediate=True),
+                                                  expire_on_commit=False)
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._amenity_catalog = None
+        self.metrics = ReservationMetrics()
+
+    async def search_hotels(self, text: str, limit: int = 20) -> List[Hotel]:
+        async with self._sessions() as session:
+            return list(await session.scalars(ranked_hotels_query(text, limit).options(*_HOTEL_LOADS)))
+
+    async def find_available_rooms(self, criteria: SearchCriteria) -> List[Room]:
+        async with self._sessions() as session:
+            catalog = await self._amenities(session, criteria.amenities)
+            return list(await session.scalars(available_rooms_query(criteria, amenity_catalog=catalog)))
+
+    async def find_available_room_views(self, criteria: SearchCriteria) -> List[RoomView]:
+        # the same search as read-only projections, for results that are only serialized
+        async with self._sessions() as session:
+            catalog = await self._amenities(session, criteria.amenities)
+            query = rooms_query(available_rooms_query(criteria, amenity_catalog=catalog))
+            return Projector().rooms(await session.execute(query))
+
+    async def is_available(self, hotel_id: int, room_number: str, start_date: date, end_date: date) -> bool:
+        async with self._sessions() as session:
+            return not await session.scalar(select(overlapping_booking(hotel_id, room_number, start_date, end_date)))
+
+    async def make_reservation(self, guest_id: int, hotel_id: int, room_number: str, start_date: date,
+                               end_date: date, number_of_guests: int = 1, comment: str | None = None) -> Booking:
+        # same protocol as ReservationManager.make_reservation, but waiting for the lock does not block the loop
+        if end_date <= start_date:
+            raise ValueError("end_date must be after start_date")
+        retries = 0
+        while True:
+            try:
+                booking_id = await self._insert_booking(guest_id, hotel_id, room_number, start_date, end_date,
+                                                        number_of_guests, comment)
+            except RoomNotAvailableError:
+                self.metrics.record(conflicts=1, retries=retries)
+                raise
+            except OperationalError as err:
+                if not is_locked_error(err) or retries >= self._max_retries:
+                    self.metrics.record(failures=1, retries=retries)
+                    raise
+                retries += 1
+                await asyncio.sleep(random.uniform(0, min(self._max_backoff, self._backoff * 2 ** retries)))
+                continue
+            break
+        self.metrics.record(bookings=1, retries=retries)
+        # loaded in a read session once the booking is committed, an error of this read must not retry the insert
+        async with self._sessions() as session:
+            return await session.scalar(select(Booking).where(Booking.id == booking_id).options(*_BOOKING_LOADS))
+
+    async def cancel_reservation(self, booking_id: int) -> bool:
+        async with self._write_sessions() as session, session.begin():
+            booking = await session.get(Booking, booking_id)
+            if booking is None:
+                return False
+            await session.delete(booking)
+        return True
+
+    async def get_reservations_for_hotel(self, hotel_id: int) -> List[Booking]:
+        async with self._sessions() as session:
+            query = (select(Booking).where(Booking.room_hotel_id == hotel_id).options(*_BOOKING_LOADS)
+                     .order_by(Booking.start_date))
+            return list(await session.scalars(query))
+
+    async def get_reservations_for_guest(self, guest_id: int) -> List[Booking]:
+        async with self._sessions() as session:
+            query = (select(Booking).where(Booking.guest_id == guest_id).options(*_BOOKING_LOADS)
+                     .order_by(Booking.start_date))
+            return list(await session.scalars(query))
+
+    async def get_hotel(self, hotel_id: int) -> HotelSnapshot | None:
+        # hotel with address and rooms from the catalogue cache, the database is only read on a miss
+        async with self._sessions() as session:
+            return await session.run_sync(catalogue_cache.hotel, hotel_id)
+
+    async def get_hotels(self, offset: int = 0, limit: int = 100) -> List[Hotel]:
+        async with self._sessions() as session:
+            query = select(Hotel).options(*_HOTEL_LOADS).order_by(Hotel.id).offset(offset).limit(limit)
+            return list(await session.scalars(query))
+
+    async def get_hotel_views(self, offset: int = 0, limit: int = 100) -> List[HotelSnapshot]:
+        # a page of the cached catalogue, read-only snapshots like the projections
+        async with self._sessions() as session:
+            hotels = await session.run_sync(catalogue_cache.hotels)
+        return list(hotels[offset:offset + limit])
+
+    async def create_hotel(self, name: str, stars: int, street: str, zip: str, city: str) -> Hotel:
+        async with self._write_sessions() as session, session.begin():
+            hotel = Hotel(name=name, stars=stars, address=Address(street=street, zip=zip, city=city), rooms=[])
+            session.add(hotel)
+        catalogue_cache.invalidate()
+        return hotel
+
+    async def update_hotel(self, hotel_id: int, name: str | None = None, stars: int | None = None,
+                           street: str | None = None, zip: str | None = None, city: str | None = None) -> Hotel | None:
+        async with self._write_sessions() as session, session.begin():
+            hotel = await session.get(Hotel, hotel_id, options=_HOTEL_LOADS)
+            if hotel is None:
+                return None
+            for obj, attribute, value in ((hotel, "name", name), (hotel, "stars", stars),
+                                          (hotel.address, "street", street), (hotel.address, "zip", zip),
+                                          (hotel.address, "city", city)):
+                if value is not None:
+                    setattr(obj, attribute, value)
+        catalogue_cache.invalidate(hotel_id)
+        return hotel
+
+    async def delete_hotel(self, hotel_id: int) -> bool:
+        # hotels with bookings are kept, their rooms are still referenced
+        async with self._write_sessions() as session, session.begin():
+            hotel = await session.get(Hotel, hotel_id, options=[selectinload(Hotel.rooms)])
+            if hotel is None:
+                return False
+            if await session.scalar(select(Booking.id).where(Booking.room_hotel_id == hotel_id).limit(1)):
+                raise ValueError(f"Hotel {hotel_id} has bookings and cannot be deleted")
+            for room in hotel.rooms:
+                await session.delete(room)
+            await session.delete(hotel)
+        catalogue_cache.invalidate(hotel_id)
+        return True
+
+    async def _insert_booking(self, guest_id: int, hotel_id: int, room_number: str, start_date: date,
+                              end_date: date, number_of_guests: int, comment: str | None) -> int:
+        # returns the id of the committed booking
+        async with self._write_sessions() as session, session.begin():
+            room = await session.get(Room, (hotel_id, room_number))
+            if room is None:
+                raise ValueError(f"Room {room_number} of hotel {hotel_id} does not exist")
+            if number_of_guests > room.max_guests:
+                raise ValueError(f"Room {room_number} of hotel {hotel_id} takes at most {room.max_guests} guests")
+            if await session.scalar(select(overlapping_booking(hotel_id, room_number, start_date, end_date))):
+                raise RoomNotAvailableError(f"Room {room_number} of hotel {hotel_id} is not available "
+                                            f"from {start_date} to {end_date}")
+            booking = Booking(room_hotel_id=hotel_id, room_number=room_number, guest_id=guest_id,
+                              number_of_guests=number_of_guests, start_date=start_date, end_date=end_date,
+                              comment=comment)
+            session.add(booking)
+        return booking.id
+
+    async def _amenities(self, session: AsyncSession, names: List[str]) -> dict[str, tuple[int, int | None]]:
+        if self._amenity_catalog is None or any(name.lower() not in self._amenity_catalog for name in names):
+            self._amenity_catalog = await session.run_sync(amenity_catalog)
+        return self._amenity_catalog
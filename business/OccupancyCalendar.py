@@ -0,0 +1,120 @@
+# occupancy matrix rooms x days, used for availability over all hotels at once and for occupancy reports
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import Engine, select
+
+from data_models.models import *
+
+
+class OccupancyCalendar(object):
+    '''
+    Occupancy of every room for a fixed horizon of days.
+
+    Row i of the matrix belongs to the room with the primary key keys[i], column j to the day start + j.
+    The rooms are ordered by hotel, so every hotel is a contiguous block of rows. Room attributes needed
+    for filtering (hotel_id, max_guests, price) are held as arrays aligned with the rows, so searches and
+    aggregates are a few vectorized reductions instead of loops over rooms and bookings.
+    '''
+
+    def __init__(self, start: date, days: int = 365):
+        self.start = start
+        self.days = days
+        self.keys: List[tuple[int, str]] = []
+        self.hotel_ids = np.empty(0, dtype=np.int64)
+        self.max_guests = np.empty(0, dtype=np.int32)
+        self.prices = np.empty(0, dtype=np.float64)
+        self.occupied = np.zeros((0, days), dtype=bool)
+        self._rows: dict[tuple[int, str], int] = {}
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.days)
+
+    @classmethod
+    def from_engine(cls, engine: Engine, start: date, days: int = 365) -> "OccupancyCalendar":
+        calendar = cls(start, days)
+        calendar.load(engine)
+        return calendar
+
+    def load(self, engine: Engine):
+        rooms_query = (
+            select(Room.hotel_id, Room.number, Room.max_guests, Room.price)
+            .order_by(Room.hotel_id, Room.number)
+        )
+        bookings_query = (
+            select(Booking.room_hotel_id, Booking.room_number, Booking.start_date, Booking.end_date)
+            .where(Booking.start_date < self.end)
+            .where(Booking.end_date > self.start)
+        )
+        with engine.connect() as connection:
+            rooms = connection.execute(rooms_query).all()
+            self.keys = [(hotel_id, number) for hotel_id, number, _, _ in rooms]
+            self._rows = {key: i for i, key in enumerate(self.keys)}
+            self.hotel_ids = np.fromiter((room[0] for room in rooms), dtype=np.int64, count=len(rooms))
+            self.max_guests = np.fromiter((room[2] for room in rooms), dtype=np.int32, count=len(rooms))
+            self.prices = np.fromiter((room[3] for room in rooms), dtype=np.float64, count=len(rooms))
+
+            rows, first_days, last_days = [], [], []
+            for hotel_id, number, start_date, end_date in connection.execute(bookings_query):
+                rows.append(self._rows[(hotel_id, number)])
+                first_days.append((start_date - self.start).days)
+                last_days.append((end_date - self.start).days)
+
+        # +1 at the first and -1 after the last night of each booking, the running sum counts the bookings per night
+        rows = np.asarray(rows, dtype=np.int64)
+        first_days = np.clip(np.asarray(first_days, dtype=np.int64), 0, self.days)
+        last_days = np.clip(np.asarray(last_days, dtype=np.int64), 0, self.days)
+        changes = np.zeros((len(self.keys), self.days + 1), dtype=np.int32)
+        np.add.at(changes, (rows, first_days), 1)
+        np.add.at(changes, (rows, last_days), -1)
+        self.occupied = np.cumsum(changes, axis=1)[:, :self.days] > 0
+
+    def book(self, hotel_id: int, room_number: str, start_date: date, end_date: date):
+        first, last = self._day_range(start_date, end_date, clip=True)
+        self.occupied[self._rows[(hotel_id, room_number)], first:last] = True
+
+    def release(self, hotel_id: int, room_number: str, start_date: date, end_date: date):
+        # only correct if the released nights are not covered by a second booking, otherwise use load()
+        first, last = self._day_range(start_date, end_date, clip=True)
+        self.occupied[self._rows[(hotel_id, room_number)], first:last] = False
+
+    def free_rooms(self, start_date: date, end_date: date, number_of_guests: int = 1,
+                   max_price: float | None = None) -> List[tuple[int, str]]:
+        first, last = self._day_range(start_date, end_date)
+        mask = ~self.occupied[:, first:last].any(axis=1)
+        mask &= self.max_guests >= number_of_guests
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        return [self.keys[i] for i in np.flatnonzero(mask)]
+
+    def occupancy_by_hotel(self, start_date: date | None = None, end_date: date | None = None) -> dict[int, float]:
+        hotel_ids, matrix = self.occupancy_by_hotel_and_day(start_date, end_date)
+        return dict(zip(hotel_ids.tolist(), matrix.mean(axis=1).tolist()))
+
+    def occupancy_by_day(self, start_date: date | None = None, end_date: date | None = None) -> np.ndarray:
+        first, last = self._day_range(start_date or self.start, end_date or self.end)
+        if not len(self.keys):
+            return np.zeros(last - first)
+        return self.occupied[:, first:last].mean(axis=0)
+
+    def occupancy_by_hotel_and_day(self, start_date: date | None = None,
+                                   end_date: date | None = None) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Returns the hotel ids and a matrix hotels x days with the share of occupied rooms.
+        '''
+        first, last = self._day_range(start_date or self.start, end_date or self.end)
+        if not len(self.keys):
+            return self.hotel_ids, np.zeros((0, last - first))
+        hotel_ids, block_starts, rooms_per_hotel = np.unique(self.hotel_ids, return_index=True, return_counts=True)
+        booked_rooms = np.add.reduceat(self.occupied[:, first:last], block_starts, axis=0, dtype=np.int64)
+        return hotel_ids, booked_rooms / rooms_per_hotel[:, np.newaxis]
+
+    def _day_range(self, start_date: date, end_date: date, clip: bool = False) -> tuple[int, int]:
+        first = (start_date - self.start).days
+        last = (end_date - self.start).days
+        if clip:
+            return max(first, 0), min(last, self.days)
+        if first < 0 or last > self.days or last <= first:
+            raise ValueError(f"{start_date} - {end_date} is not within {self.start} - {self.end}")
+        return first, last
@@ -0,0 +1,159 @@
+# in-memory occupancy of every room, used to answer availability checks without a database round trip
+# built once from the booking table and kept up to date by session events (see OccupancyIndex.listen)
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from sqlalchemy import Engine, event, inspect, select
+from sqlalchemy.orm import Session
+
+from data_models.models import *
+
+
+class RoomOccupancy(object):
+    '''
+    Bookings of a single room as sorted interval array.
+
+    The intervals are sorted by start date and accompanied by the running maximum of the end dates.
+    All bookings starting before the end of a requested stay are found with one bisect, the running
+    maximum tells whether any of them ends after its start. Overlap checks are therefore O(log n),
+    even if the stored bookings overlap each other.
+    '''
+    __slots__ = ("_starts", "_ends", "_max_ends", "_ids")
+
+    def __init__(self):
+        self._starts: List[date] = []
+        self._ends: List[date] = []
+        self._max_ends: List[date] = []
+        self._ids: List[int] = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, booking_id: int, start_date: date, end_date: date):
+        i = bisect_right(self._starts, start_date)
+        self._starts.insert(i, start_date)
+        self._ends.insert(i, end_date)
+        self._ids.insert(i, booking_id)
+        self._max_ends.insert(i, end_date)
+        self._update_max_ends(i)
+
+    def remove(self, booking_id: int, start_date: date):
+        i = bisect_left(self._starts, start_date)
+        while self._ids[i] != booking_id:
+            i += 1
+        del self._starts[i], self._ends[i], self._ids[i], self._max_ends[i]
+        self._update_max_ends(i)
+
+    def overlaps(self, start_date: date, end_date: date) -> bool:
+        i = bisect_left(self._starts, end_date)
+        return i > 0 and self._max_ends[i - 1] > start_date
+
+    def _update_max_ends(self, i: int):
+        # appending a booking (the usual case) only touches the last entry
+        current = self._max_ends[i - 1] if i > 0 else None
+        for j in range(i, len(self._ends)):
+            end_date = self._ends[j]
+            current = end_date if current is None or end_date > current else current
+            if j > i and self._max_ends[j] == current:
+                break
+            self._max_ends[j] = current
+
+
+class OccupancyIndex(object):
+    '''
+    Occupancy of all rooms, keyed by the primary key (hotel_id, number) of Room.
+    '''
+
+    def __init__(self):
+        self._rooms: dict[tuple[int, str], RoomOccupancy] = {}
+        self._bookings: dict[int, tuple[tuple[int, str], date, date]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._bookings)
+
+    @classmethod
+    def from_engine(cls, engine: Engine) -> "OccupancyIndex":
+        index = cls()
+        index.load(engine)
+        return index
+
+    def load(self, engine: Engine):
+        query = (
+            select(Booking.id, Booking.room_hotel_id, Booking.room_number, Booking.start_date, Booking.end_date)
+            .order_by(Booking.room_hotel_id, Booking.room_number, Booking.start_date)
+        )
+        with self._lock:
+            self._rooms.clear()
+            self._bookings.clear()
+            with engine.connect() as connection:
+                for booking_id, hotel_id, room_number, start_date, end_date in connection.execute(query):
+                    self.add(booking_id, hotel_id, room_number, start_date, end_date)
+
+    def add(self, booking_id: int, hotel_id: int, room_number: str, start_date: date, end_date: date):
+        key = (hotel_id, room_number)
+        with self._lock:
+            if booking_id in self._bookings:
+                self.remove(booking_id)
+            room = self._rooms.get(key)
+            if room is None:
+                room = self._rooms[key] = RoomOccupancy()
+            room.add(booking_id, start_date, end_date)
+            self._bookings[booking_id] = (key, start_date, end_date)
+
+    def remove(self, booking_id: int):
+        with self._lock:
+            entry = self._bookings.pop(booking_id, None)
+            if entry is None:
+                return
+            key, start_date, _ = entry
+            room = self._rooms[key]
+            room.remove(booking_id, start_date)
+            if not len(room):
+                del self._rooms[key]
+
+    def is_available(self, hotel_id: int, room_number: str, start_date: date, end_date: date) -> bool:
+        with self._lock:
+            room = self._rooms.get((hotel_id, room_number))
+            return room is None or not room.overlaps(start_date, end_date)
+
+    def listen(self, session_factory):
+        '''
+        Keeps the index in sync with bookings inserted, changed or deleted through the given sessionmaker.
+        Changes are collected on flush and only applied once the transaction is committed.
+        Bookings written with Core statements bypass the ORM and have to be added with add() or load().
+        '''
+        event.listen(session_factory, "after_flush", self._after_flush)
+        event.listen(session_factory, "after_commit", self._after_commit)
+        event.listen(session_factory, "after_rollback", self._after_rollback)
+
+    def _after_flush(self, session: Session, flush_context):
+        pending = session.info.setdefault("occupancy_index_pending", [])
+        for booking in session.new:
+            if isinstance(booking, Booking):
+                pending.append((True, booking.id, booking.room_hotel_id, booking.room_number,
+                                booking.start_date, booking.end_date))
+        for booking in session.dirty:
+            if isinstance(booking, Booking) and session.is_modified(booking):
+                state = inspect(booking)
+                if any(state.attrs[name].history.has_changes()
+                       for name in ("room_hotel_id", "room_number", "start_date", "end_date")):
+                    pending.append((True, booking.id, booking.room_hotel_id, booking.room_number,
+                                    booking.start_date, booking.end_date))
+        for booking in session.deleted:
+            if isinstance(booking, Booking):
+                pending.append((False, booking.id, None, None, None, None))
+
+    def _after_commit(self, session: Session):
+        pending = session.info.pop("occupancy_index_pending", [])
+        with self._lock:
+            for is_upsert, booking_id, hotel_id, room_number, start_date, end_date in pending:
+                if is_upsert:
+                    self.add(booking_id, hotel_id, room_number, start_date, end_date)
+                else:
+                    self.remove(booking_id)
+
+    @staticmethod
+    def _after_rollback(session: Session):
+        session.info.pop("occupancy_index_pending", None)
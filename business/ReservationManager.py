@@ -1,3 +1,178 @@
 # include all functions related to reservations here
 # make reservation, retrieve all reservations for a hotel, retrieve reservations for a user
-# check for appropriate user roles inside the functions
\ No newline at end of file
+# check for appropriate user roles inside the functions
+import random
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import Engine, Exists, exists, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, joinedload
+
+from business.OccupancyIndex import OccupancyIndex
+from data_access.engine_factory import sqlite_transactions_enabled
+from data_models.models import *
+
+
+# the reservations are returned detached, everything their __repr__ touches is loaded with them
+_BOOKING_LOADS = (
+    joinedload(Booking.room).joinedload(Room.hotel).joinedload(Hotel.address),
+    joinedload(Booking.guest).joinedload(Guest.address),
+)
+
+
+class RoomNotAvailableError(Exception):
+    pass
+
+
+def overlapping_booking(hotel_id: int, room_number: str, start_date: date, end_date: date) -> Exists:
+    # any booking of the room overlapping [start_date, end_date), answered by ix_booking_room_dates
+    return (
+        exists()
+        .where(Booking.room_hotel_id == hotel_id)
+        .where(Booking.room_number == room_number)
+        .where(Booking.start_date < end_date)
+        .where(Booking.end_date > start_date)
+    )
+
+
+def is_locked_error(err: OperationalError) -> bool:
+    # the write lock was not available within busy_timeout, the transaction can be retried
+    message = str(err.orig).lower()
+    return "locked" in message or "busy" in message
+
+
+class ReservationMetrics(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.attempts = 0
+        self.bookings = 0
+        self.conflicts = 0
+        self.retries = 0
+        self.failures = 0
+
+    def record(self, bookings: int = 0, conflicts: int = 0, retries: int = 0, failures: int = 0):
+        with self._lock:
+            self.attempts += bookings + conflicts + failures
+            self.bookings += bookings
+            self.conflicts += conflicts
+            self.retries += retries
+            self.failures += failures
+
+    def throughput(self) -> float:
+        # committed bookings per second since the metrics were created or reset
+        elapsed = time.perf_counter() - self._started
+        return self.bookings / elapsed if elapsed > 0 else 0.0
+
+    def conflict_rate(self) -> float:
+        return self.conflicts / self.attempts if self.attempts else 0.0
+
+    def reset(self):
+        with self._lock:
+            self._started = time.perf_counter()
+            self.attempts = self.bookings = self.conflicts = self.retries = self.failures = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "bookings": self.bookings,
+            "conflicts": self.conflicts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "bookings_per_second": self.throughput(),
+            "conflict_rate": self.conflict_rate(),
+        }
+
+    def __repr__(self) -> str:
+        return f"ReservationMetrics({', '.join(f'{k}={v!r}' for k, v in self.as_dict().items())})"
+
+
+class ReservationManager(object):
+    '''
+    Makes reservations from many threads at once without double-booking a room.
+
+    Every reservation runs in its own short BEGIN IMMEDIATE transaction: the write lock is taken before the
+    overlap check, so check and insert cannot interleave with another writer. Writers that do not get the
+    lock are retried with exponential backoff and jitter instead of queueing behind a global lock.
+    '''
+
+    def __init__(self, engine: Engine, occupancy_index: OccupancyIndex | None = None,
+                 max_retries: int = 8, backoff: float = 0.005, max_backoff: float = 0.5):
+        if not sqlite_transactions_enabled(engine):
+            raise ValueError("the engine has to come from data_access.engine_factory, "
+                             "other engines cannot start BEGIN IMMEDIATE transactions")
+        self._engine = engine.execution_options(sqlite_immediate=True)
+        self._occupancy_index = occupancy_index
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self.metrics = ReservationMetrics()
+
+    def make_reservation(self, guest_id: int, hotel_id: int, room_number: str, start_date: date, end_date: date,
+                         number_of_guests: int = 1, comment: str | None = None) -> Booking:
+        if end_date <= start_date:
+            raise ValueError("end_date must be after start_date")
+        retries = 0
+        while True:
+            try:
+                booking_id = self._insert_booking(guest_id, hotel_id, room_number, start_date, end_date,
+                                                  number_of_guests, comment)
+            except RoomNotAvailableError:
+                self.metrics.record(conflicts=1, retries=retries)
+                raise
+            except OperationalError as err:
+                if not is_locked_error(err) or retries >= self._max_retries:
+                    self.metrics.record(failures=1, retries=retries)
+                    raise
+                retries += 1
+                delay = min(self._max_backoff, self._backoff * 2 ** retries)
+                time.sleep(random.uniform(0, delay))
+                continue
+            break
+        self.metrics.record(bookings=1, retries=retries)
+        if self._occupancy_index is not None:
+            self._occupancy_index.add(booking_id, hotel_id, room_number, start_date, end_date)
+        # the booking is committed, an error of this read must not retry the insert
+        with Session(self._engine.execution_options(sqlite_immediate=False)) as session:
+            return session.scalar(select(Booking).where(Booking.id == booking_id).options(*_BOOKING_LOADS))
+
+    def cancel_reservation(self, booking_id: int):
+        with Session(self._engine) as session, session.begin():
+            booking = session.get(Booking, booking_id)
+            if booking is None:
+                return
+            session.delete(booking)
+        if self._occupancy_index is not None:
+            self._occupancy_index.remove(booking_id)
+
+    def get_reservations_for_hotel(self, hotel_id: int) -> List[Booking]:
+        with Session(self._engine.execution_options(sqlite_immediate=False)) as session:
+            query = (select(Booking).where(Booking.room_hotel_id == hotel_id).options(*_BOOKING_LOADS)
+                     .order_by(Booking.start_date))
+            return list(session.scalars(query))
+
+    def get_reservations_for_guest(self, guest_id: int) -> List[Booking]:
+        with Session(self._engine.execution_options(sqlite_immediate=False)) as session:
+            query = (select(Booking).where(Booking.guest_id == guest_id).options(*_BOOKING_LOADS)
+                     .order_by(Booking.start_date))
+            return list(session.scalars(query))
+
+    def _insert_booking(self, guest_id: int, hotel_id: int, room_number: str, start_date: date, end_date: date,
+                        number_of_guests: int, comment: str | None) -> int:
+        # returns the id of the committed booking
+        with Session(self._engine, expire_on_commit=False) as session, session.begin():
+            room = session.get(Room, (hotel_id, room_number))
+            if room is None:
+                raise ValueError(f"Room {room_number} of hotel {hotel_id} does not exist")
+            if number_of_guests > room.max_guests:
+                raise ValueError(f"Room {room_number} of hotel {hotel_id} takes at most {room.max_guests} guests")
+            if session.scalar(select(overlapping_booking(hotel_id, room_number, start_date, end_date))):
+                raise RoomNotAvailableError(f"Room {room_number} of hotel {hotel_id} is not available "
+                                            f"from {start_date} to {end_date}")
+            booking = Booking(room_hotel_id=hotel_id, room_number=room_number, guest_id=guest_id,
+                              number_of_guests=number_of_guests, start_date=start_date, end_date=end_date,
+                              comment=comment)
+            session.add(booking)
+        return booking.id
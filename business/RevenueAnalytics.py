@@ -0,0 +1,220 @@
+# revenue and occupancy analytics over all bookings, computed column-wise with NumPy
+# the bookings are read once, joined with the room price, into one array per column; every metric is a handful
+# of vectorized operations over these arrays instead of a loop with a lazy load of Booking.room per booking.
+# Arrays and results are cached until the booking or room table changes (see data_access.table_versions).
+#
+# days are stored as int32 days since 1970-01-01, which is what NumPy's datetime64[D] counts as well
+import threading
+from datetime import date
+
+import numpy as np
+from sqlalchemy import Engine, Integer, cast, func, select
+
+from data_access.table_versions import table_versions
+from data_models.models import *
+
+# julianday() of 1970-01-01
+EPOCH_JULIAN_DAY = 2440587.5
+# booked_on of bookings without a booking date
+NO_DATE = np.iinfo(np.int32).min
+# lower bounds of the lead time buckets in days: same day, up to a week, a month, three months, half a year, more
+LEAD_TIME_BUCKETS = (0, 1, 8, 31, 91, 181)
+
+BOOKING_DTYPE = np.dtype([("hotel_id", np.int32), ("start", np.int32), ("end", np.int32), ("price", np.float64),
+                          ("guests", np.int16), ("booked_on", np.int32)])
+
+HOTEL_MONTH_DTYPE = np.dtype([
+    ("hotel_id", np.int32), ("month", "datetime64[M]"), ("rooms", np.int32), ("available_room_nights", np.int64),
+    ("room_nights", np.int64), ("revenue", np.float64), ("occupancy", np.float64), ("adr", np.float64),
+    ("revpar", np.float64),
+])
+
+
+def _epoch_day(column):
+    return cast(func.julianday(column) - EPOCH_JULIAN_DAY, Integer)
+
+
+def _day(value: date) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    # 0 where the denominator is 0, e.g. the ADR of a month without sold room nights
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator != 0)
+
+
+class RevenueAnalytics(object):
+    '''
+    Revenue per hotel and month with occupancy, ADR (average daily rate: revenue per sold room night) and RevPAR
+    (revenue per available room night), the length of stay distribution and the lead time between booking and
+    arrival. Revenue is counted per night, a stay across the end of a month counts in both months.
+
+    One instance should be shared, e.g. by a dashboard: the first call reads the bookings, further calls only
+    check the table versions and return cached results as long as nothing changed.
+    '''
+
+    def __init__(self, engine: Engine, batch_size: int = 100_000):
+        self._engine = engine
+        self._batch_size = batch_size
+        self._versions: tuple[int, ...] | None = None
+        self._cache: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def bookings(self) -> np.ndarray:
+        '''
+        All bookings as structured array of BOOKING_DTYPE, ordered by id. Read-only, it is shared by all callers.
+        '''
+        return self._cached(("bookings",), self._load_bookings)
+
+    def rooms_per_hotel(self) -> tuple[np.ndarray, np.ndarray]:
+        # hotel ids in ascending order and their number of rooms
+        return self._cached(("rooms",), self._load_rooms)
+
+    def revenue_per_hotel_month(self, start: date | None = None, end: date | None = None) -> np.ndarray:
+        '''
+        One row (HOTEL_MONTH_DTYPE) per hotel and month of [start, end), also for months without bookings.
+        Without start and end the period covers all bookings. Months cut by the period only count their days
+        inside the period.
+        '''
+        return self._cached(("revenue_per_hotel_month", start, end), lambda: self._revenue_per_hotel_month(start, end))
+
+    def totals(self, start: date | None = None, end: date | None = None) -> dict[str, float]:
+        table = self.revenue_per_hotel_month(start, end)
+        available, sold, revenue = (float(table[name].sum())
+                                    for name in ("available_room_nights", "room_nights", "revenue"))
+        return {"revenue": revenue, "room_nights": sold, "available_room_nights": available,
+                "occupancy": sold / available if available else 0.0, "adr": revenue / sold if sold else 0.0,
+                "revpar": revenue / available if available else 0.0}
+
+    def length_of_stay(self, start: date | None = None, end: date | None = None) -> np.ndarray:
+        '''
+        Number of bookings per length of stay: element n is the number of bookings of n nights.
+        With start/end only bookings arriving in [start, end) are counted.
+        '''
+        def compute():
+            bookings = self._arriving(start, end)
+            return np.bincount(bookings["end"] - bookings["start"])
+
+        return self._cached(("length_of_stay", start, end), compute)
+
+    def lead_time(self, start: date | None = None, end: date | None = None) -> dict[str, object]:
+        '''
+        Days between booking and arrival of the bookings arriving in [start, end) that have a booking date:
+        mean, median, 90th percentile and the number of bookings per LEAD_TIME_BUCKETS bucket.
+        '''
+        def compute():
+            bookings = self._arriving(start, end)
+            bookings = bookings[bookings["booked_on"] != NO_DATE]
+            days = bookings["start"] - bookings["booked_on"]
+            if not len(days):
+                return {"bookings": 0, "mean": 0.0, "median": 0.0, "p90": 0.0, "buckets": {}}
+            counts = np.bincount(np.searchsorted(LEAD_TIME_BUCKETS, days, side="right"),
+                                 minlength=len(LEAD_TIME_BUCKETS) + 1)
+            labels = [f"< {LEAD_TIME_BUCKETS[0]}"] + [
+                f"{low}-{high - 1}" if high - 1 > low else f"{low}"
+                for low, high in zip(LEAD_TIME_BUCKETS, LEAD_TIME_BUCKETS[1:])
+            ] + [f">= {LEAD_TIME_BUCKETS[-1]}"]
+            return {"bookings": len(days), "mean": float(days.mean()), "median": float(np.median(days)),
+                    "p90": float(np.percentile(days, 90)),
+                    "buckets": {label: int(count) for label, count in zip(labels, counts) if count or label[0] != "<"}}
+
+        return self._cached(("lead_time", start, end), compute)
+
+    def invalidate(self):
+        with self._lock:
+            self._versions = None
+            self._cache.clear()
+
+    def _cached(self, key: tuple, compute):
+        with self._lock:
+            with self._engine.connect() as connection:
+                versions = table_versions(connection)
+            if versions != self._versions:
+                self._cache.clear()
+                self._versions = versions
+            result = self._cache.get(key)
+        if result is None:
+            # computed outside of the lock, concurrent first calls may compute the same result twice
+            result = compute()
+            with self._lock:
+                if self._versions == versions:
+                    self._cache[key] = result
+        return result
+
+    def _load_bookings(self) -> np.ndarray:
+        query = (
+            select(Booking.room_hotel_id, _epoch_day(Booking.start_date), _epoch_day(Booking.end_date), Room.price,
+                   Booking.number_of_guests, func.coalesce(_epoch_day(Booking.booked_on), int(NO_DATE)))
+            .join(Booking.room)
+            .order_by(Booking.id)
+        )
+        with self._engine.connect() as connection:
+            result = connection.execution_options(yield_per=self._batch_size).execute(query)
+            # one array per batch, so the rows of only one batch exist as Python objects at a time
+            batches = [np.fromiter(map(tuple, batch), BOOKING_DTYPE, len(batch)) for batch in result.partitions()]
+        self.loads += 1
+        bookings = np.concatenate(batches) if batches else np.empty(0, BOOKING_DTYPE)
+        bookings.flags.writeable = False
+        return bookings
+
+    def _load_rooms(self) -> tuple[np.ndarray, np.ndarray]:
+        query = select(Hotel.id, func.count(Room.number)).outerjoin(Hotel.rooms).group_by(Hotel.id).order_by(Hotel.id)
+        with self._engine.connect() as connection:
+            rows = connection.execute(query).all()
+        hotel_ids = np.array([hotel_id for hotel_id, _ in rows], dtype=np.int32)
+        rooms = np.array([rooms for _, rooms in rows], dtype=np.int32)
+        return hotel_ids, rooms
+
+    def _arriving(self, start: date | None, end: date | None) -> np.ndarray:
+        bookings = self.bookings()
+        if start is not None:
+            bookings = bookings[bookings["start"] >= _day(start)]
+        if end is not None:
+            bookings = bookings[bookings["start"] < _day(end)]
+        return bookings
+
+    def _revenue_per_hotel_month(self, start: date | None, end: date | None) -> np.ndarray:
+        bookings = self.bookings()
+        hotel_ids, rooms = self.rooms_per_hotel()
+        if not len(hotel_ids) or (start is None or end is None) and not len(bookings):
+            return np.empty(0, HOTEL_MONTH_DTYPE)
+        first_day = _day(start) if start is not None else int(bookings["start"].min())
+        stop_day = _day(end) if end is not None else int(bookings["end"].max())
+        if stop_day <= first_day:
+            return np.empty(0, HOTEL_MONTH_DTYPE)
+
+        # every booked night: its booking and its day, without a Python loop over the bookings
+        nights = (bookings["end"] - bookings["start"]).astype(np.int64)
+        booking_of_night = np.repeat(np.arange(len(bookings)), nights)
+        first_night_of_booking = np.repeat(np.cumsum(nights) - nights, nights)
+        night = bookings["start"][booking_of_night] + (np.arange(len(booking_of_night)) - first_night_of_booking)
+        inside = (night >= first_day) & (night < stop_day)
+        booking_of_night, night = booking_of_night[inside], night[inside]
+
+        # months of the period and the number of their days inside the period
+        first_month = np.datetime64(first_day, "D").astype("datetime64[M]")
+        months = np.arange(first_month, np.datetime64(stop_day - 1, "D").astype("datetime64[M]") + 1)
+        month_starts = months.astype("datetime64[D]").astype(np.int64)
+        days = (np.minimum(np.append(month_starts[1:], stop_day), stop_day)
+                - np.maximum(month_starts, first_day))
+
+        # dense hotel x month grid, cell = hotel position * number of months + month position
+        hotel_position = np.searchsorted(hotel_ids, bookings["hotel_id"][booking_of_night])
+        month_position = (np.datetime64(0, "D") + night.astype("timedelta64[D]")).astype("datetime64[M]") - first_month
+        cell = hotel_position * len(months) + month_position.astype(np.int64)
+        cells = len(hotel_ids) * len(months)
+        room_nights = np.bincount(cell, minlength=cells)
+        revenue = np.bincount(cell, weights=bookings["price"][booking_of_night], minlength=cells)
+
+        table = np.empty(cells, HOTEL_MONTH_DTYPE)
+        table["hotel_id"] = np.repeat(hotel_ids, len(months))
+        table["month"] = np.tile(months, len(hotel_ids))
+        table["rooms"] = np.repeat(rooms, len(months))
+        table["available_room_nights"] = np.outer(rooms, days).ravel()
+        table["room_nights"] = room_nights
+        table["revenue"] = revenue
+        table["occupancy"] = _ratio(room_nights, table["available_room_nights"])
+        table["adr"] = _ratio(revenue, room_nights)
+        table["revpar"] = _ratio(revenue, table["available_room_nights"])
+        return table
@@ -1,11 +1,119 @@
 # include all search functions here
 # accept search criteria, search by various criteria
+from datetime import date
 
-class SearchManager:
+from sqlalchemy import Select, select, exists
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.orm.scoping import scoped_session
 
-    def accept_search_criteria(self):
-        criteria = []
-        return criteria
+from business.OccupancyIndex import OccupancyIndex
+from data_access.amenities import amenities_filter, amenity_catalog, parse_amenities
+from data_access.fulltext import ranked_hotels_query
+from data_models.models import *
 
-    def show_available_hotels(self, criteria):
-        pass
\ No newline at end of file
+
+class SearchCriteria(object):
+    def __init__(self, city: str, start_date: date, end_date: date, number_of_guests: int = 1,
+                 max_price: float | None = None, amenities: List[str] | None = None):
+        self.city = city
+        self.start_date = start_date
+        self.end_date = end_date
+        self.number_of_guests = number_of_guests
+        self.max_price = max_price
+        self.amenities = amenities or []
+
+    def __repr__(self) -> str:
+        return (f"SearchCriteria(city={self.city!r}, start_date={self.start_date!r}, end_date={self.end_date!r}, "
+                f"number_of_guests={self.number_of_guests!r}, max_price={self.max_price!r}, "
+                f"amenities={self.amenities!r})")
+
+
+def available_rooms_query(criteria: SearchCriteria, check_bookings: bool = True,
+                          amenity_catalog: dict[str, tuple[int, int | None]] | None = None) -> Select:
+    # A room is free if no booking of that room overlaps [start_date, end_date).
+    # The anti-join is answered by ix_booking_room_dates, the city filter by ix_address_city,
+    # so the cost per search does not depend on the total number of bookings.
+    # Without check_bookings only the room candidates are selected, e.g. to check them against an OccupancyIndex.
+    # Amenities are matched with the amenity catalog (see data_access.amenities), which is needed if any are requested.
+    overlapping_booking = (
+        exists()
+        .where(Booking.room_hotel_id == Room.hotel_id)
+        .where(Booking.room_number == Room.number)
+        .where(Booking.start_date < criteria.end_date)
+        .where(Booking.end_date > criteria.start_date)
+    )
+    query = (
+        select(Room)
+        .join(Room.hotel)
+        .join(Hotel.address)
+        .options(contains_eager(Room.hotel).contains_eager(Hotel.address))
+        .where(Address.city == criteria.city)
+        .where(Room.max_guests >= criteria.number_of_guests)
+        .order_by(Room.price, Room.hotel_id, Room.number)
+    )
+    if check_bookings:
+        query = query.where(~overlapping_booking)
+    if criteria.max_price is not None:
+        query = query.where(Room.price <= criteria.max_price)
+    if criteria.amenities:
+        query = query.where(amenities_filter(criteria.amenities, amenity_catalog or {}))
+    return query
+
+
+class SearchManager(object):
+    def __init__(self, session_maker, occupancy_index: OccupancyIndex | None = None):
+        self._session = scoped_session(session_maker)
+        self._occupancy_index = occupancy_index
+        self._amenity_catalog = None
+
+    def accept_search_criteria(self) -> SearchCriteria:
+        city = input("City: ")
+        start_date = self._input_date("Check-in (YYYY-MM-DD): ")
+        end_date = self._input_date("Check-out (YYYY-MM-DD): ")
+        while end_date <= start_date:
+            print("Check-out must be after check-in. Please try again.")
+            end_date = self._input_date("Check-out (YYYY-MM-DD): ")
+        number_of_guests = int(input("Number of guests: ") or 1)
+        max_price = input("Max. price per night (empty for any): ")
+        amenities = parse_amenities(input("Amenities, separated by comma (empty for any): "))
+        return SearchCriteria(city, start_date, end_date, number_of_guests, float(max_price) if max_price else None,
+                              amenities)
+
+    def search_hotels(self, text: str, limit: int = 20) -> List[Hotel]:
+        # full text search over name, city, street and rooms, best matches first
+        return list(self._session.scalars(ranked_hotels_query(text, limit)))
+
+    def find_available_rooms(self, criteria: SearchCriteria) -> List[Room]:
+        catalog = self._amenities(criteria.amenities)
+        if self._occupancy_index is None:
+            return list(self._session.scalars(available_rooms_query(criteria, amenity_catalog=catalog)))
+        rooms = self._session.scalars(available_rooms_query(criteria, check_bookings=False, amenity_catalog=catalog))
+        return [room for room in rooms
+                if self._occupancy_index.is_available(room.hotel_id, room.number,
+                                                      criteria.start_date, criteria.end_date)]
+
+    def show_available_hotels(self, criteria: SearchCriteria):
+        rooms = self.find_available_rooms(criteria)
+        if not rooms:
+            print("No rooms available for", criteria)
+        hotel = None
+        for room in sorted(rooms, key=lambda r: (r.hotel_id, r.price)):
+            if room.hotel is not hotel:
+                hotel = room.hotel
+                print(hotel)
+            print(f"{' ' * 5}{room.number}: {room.type}, max. {room.max_guests} guests, {room.price:.2f}")
+        input("Press Enter to continue...")
+
+    def _amenities(self, names: List[str]) -> dict[str, tuple[int, int | None]]:
+        # the catalog is loaded once and only reloaded when an unknown amenity is requested
+        if self._amenity_catalog is None or any(name.lower() not in self._amenity_catalog for name in names):
+            self._amenity_catalog = amenity_catalog(self._session)
+        return self._amenity_catalog
+
+    @staticmethod
+    def _input_date(prompt: str) -> date:
+        while True:
+            try:
+                return date.fromisoformat(input(prompt))
+            except ValueError:
+                print("Invalid date. Please try again.")
@@ -0,0 +1,116 @@
+# normalised room amenities: amenity table, room_amenity association and a per-room bitmask
+# the free text column Room.amenities stays as the human readable form and is the source of migrate_amenities
+from sqlalchemy import ColumnElement, Connection, Engine, and_, bindparam, delete, exists, false, insert, select, true, update
+from sqlalchemy.orm import Session
+
+from data_models.models import *
+
+# bits 0..62 fit into SQLite's signed 64 bit integers, further amenities are only in room_amenity
+MAX_BITS = 63
+
+
+def parse_amenities(text: str | None) -> List[str]:
+    names = []
+    for name in (text or "").split(","):
+        name = " ".join(name.split())
+        if name and name.lower() not in (known.lower() for known in names):
+            names.append(name)
+    return names
+
+
+def migrate_amenities(bind: Engine | Connection, chunk_size: int = 10_000) -> int:
+    '''
+    Builds amenity, room_amenity and Room.amenity_mask from the comma separated Room.amenities strings.
+    Can be run again at any time, the association and the masks are rebuilt from scratch.
+    '''
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            return migrate_amenities(connection, chunk_size)
+    bind.execute(delete(room_amenity))
+    rooms = bind.execute(select(Room.hotel_id, Room.number, Room.amenities)).all()
+    return link_amenities(bind, rooms, chunk_size)
+
+
+def link_amenities(connection: Connection, rooms: List[tuple[int, str, str | None]], chunk_size: int = 10_000) -> int:
+    '''
+    Fills room_amenity and Room.amenity_mask of new rooms, given as (hotel_id, number, amenities text).
+    Amenities that do not exist yet are created.
+    '''
+    amenities = {name.lower(): (amenity_id, bit)
+                 for amenity_id, name, bit in connection.execute(select(Amenity.id, Amenity.name, Amenity.bit))}
+    used_bits = {bit for _, bit in amenities.values() if bit is not None}
+    free_bits = (bit for bit in range(MAX_BITS) if bit not in used_bits)
+
+    links, masks = [], []
+    for hotel_id, number, text in rooms:
+        mask = 0
+        for name in parse_amenities(text):
+            if name.lower() not in amenities:
+                bit = next(free_bits, None)
+                amenity_id = connection.execute(insert(Amenity).values(name=name, bit=bit)).inserted_primary_key[0]
+                amenities[name.lower()] = (amenity_id, bit)
+            amenity_id, bit = amenities[name.lower()]
+            links.append({"room_hotel_id": hotel_id, "room_number": number, "amenity_id": amenity_id})
+            if bit is not None:
+                mask |= 1 << bit
+        masks.append({"b_hotel_id": hotel_id, "b_number": number, "amenity_mask": mask})
+
+    for i in range(0, len(links), chunk_size):
+        connection.execute(insert(room_amenity), links[i:i + chunk_size])
+    update_mask = (
+        update(Room.__table__)
+        .where(Room.hotel_id == bindparam("b_hotel_id"))
+        .where(Room.number == bindparam("b_number"))
+        .values(amenity_mask=bindparam("amenity_mask"))
+    )
+    for i in range(0, len(masks), chunk_size):
+        connection.execute(update_mask, masks[i:i + chunk_size])
+    return len(rooms)
+
+
+def amenity_catalog(session: Session) -> dict[str, tuple[int, int | None]]:
+    # lower-cased name -> (id, bit), the table is small and rarely changes, callers may keep the result
+    return {name.lower(): (amenity_id, bit)
+            for amenity_id, name, bit in session.execute(select(Amenity.id, Amenity.name, Amenity.bit))}
+
+
+def amenities_filter(names: List[str], catalog: dict[str, tuple[int, int | None]]) -> ColumnElement[bool]:
+    '''
+    Condition for rooms having all the given amenities. Amenities with a bit are checked with one bitwise AND
+    on Room.amenity_mask, the others with an indexed lookup in room_amenity.
+    '''
+    mask = 0
+    conditions = []
+    for name in names:
+        if name.lower() not in catalog:
+            return false()
+        amenity_id, bit = catalog[name.lower()]
+        if bit is not None:
+            mask |= 1 << bit
+        else:
+            conditions.append(
+                exists()
+                .where(room_amenity.c.room_hotel_id == Room.hotel_id)
+                .where(room_amenity.c.room_number == Room.number)
+                .where(room_amenity.c.amenity_id == amenity_id)
+            )
+    if mask:
+        conditions.insert(0, Room.amenity_mask.op("&")(mask) == mask)
+    return and_(true(), *conditions)
+
+
+def set_room_amenities(session: Session, room: Room, names: List[str]):
+    # keeps the text column, the association and the mask of a room consistent
+    by_name = {amenity.name.lower(): amenity for amenity in session.scalars(select(Amenity))}
+    used_bits = {amenity.bit for amenity in by_name.values() if amenity.bit is not None}
+    free_bits = (bit for bit in range(MAX_BITS) if bit not in used_bits)
+    amenities = []
+    for name in parse_amenities(", ".join(names)):
+        amenity = by_name.get(name.lower())
+        if amenity is None:
+            amenity = by_name[name.lower()] = Amenity(name=name, bit=next(free_bits, None))
+            session.add(amenity)
+        amenities.append(amenity)
+    room.amenity_list = amenities
+    room.amenities = ", ".join(amenity.name for amenity in amenities)
+    room.amenity_mask = sum(1 << amenity.bit for amenity in amenities if amenity.bit is not None)
@@ -0,0 +1,119 @@
+# bulk ingestion of plain rows (dicts or tuples) with Core executemany, bypassing the ORM unit of work
+# rows are committed in chunks, so an import of any size only holds one chunk in memory
+import time
+from datetime import date
+from itertools import islice
+from typing import Iterable, Sequence
+
+from sqlalchemy import Engine, Table, insert
+
+from data_models.models import *
+
+ADDRESS_COLUMNS = ("street", "zip", "city")
+GUEST_COLUMNS = ("firstname", "lastname", "email", "address_id")
+BOOKING_COLUMNS = ("room_hotel_id", "room_number", "guest_id", "number_of_guests", "start_date", "end_date",
+                   "booked_on")
+
+
+class BulkInsertResult(object):
+    def __init__(self, table: str, rows: int = 0, chunks: int = 0, seconds: float = 0.0):
+        self.table = table
+        self.rows = rows
+        self.chunks = chunks
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (f"BulkInsertResult(table={self.table!r}, rows={self.rows!r}, chunks={self.chunks!r}, "
+                f"seconds={self.seconds:.3f}, rows_per_second={self.rows_per_second:.0f})")
+
+
+def bulk_insert(engine: Engine, table: Table, rows: Iterable[dict | Sequence], columns: Sequence[str],
+                chunk_size: int = 10_000, prepare=None, verbose: bool = False) -> BulkInsertResult:
+    '''
+    Inserts rows into table with one executemany per chunk and commits every chunk.
+    Tuples are mapped to the given columns by position, dicts are used as they are.
+    '''
+    result = BulkInsertResult(table.name)
+    statement = insert(table)
+    started = time.perf_counter()
+    rows = iter(rows)
+    while True:
+        chunk = [_as_dict(row, columns) for row in islice(rows, chunk_size)]
+        if not chunk:
+            break
+        if prepare is not None:
+            chunk = [prepare(row) for row in chunk]
+        with engine.begin() as connection:
+            connection.execute(statement, chunk)
+        result.rows += len(chunk)
+        result.chunks += 1
+    result.seconds = time.perf_counter() - started
+    if verbose:
+        print(result)
+    return result
+
+
+def bulk_insert_prepared(engine: Engine, table: Table, rows: Iterable[Sequence], columns: Sequence[str],
+                         chunk_size: int = 50_000, verbose: bool = False) -> BulkInsertResult:
+    '''
+    Like bulk_insert, for tuples that are already in the driver's format (dates as ISO strings): they are passed
+    to the DBAPI executemany as they are, without SQLAlchemy's per row parameter processing.
+    '''
+    result = BulkInsertResult(table.name)
+    statement = (f"INSERT INTO {table.name} ({', '.join(columns)}) "
+                 f"VALUES ({', '.join('?' for _ in columns)})")
+    started = time.perf_counter()
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        with engine.begin() as connection:
+            connection.exec_driver_sql(statement, chunk)
+        result.rows += len(chunk)
+        result.chunks += 1
+    result.seconds = time.perf_counter() - started
+    if verbose:
+        print(result)
+    return result
+
+
+def bulk_insert_addresses(engine: Engine, rows: Iterable[dict | Sequence], chunk_size: int = 10_000,
+                          verbose: bool = False) -> BulkInsertResult:
+    return bulk_insert(engine, Address.__table__, rows, ADDRESS_COLUMNS, chunk_size, verbose=verbose)
+
+
+def bulk_insert_guests(engine: Engine, rows: Iterable[dict | Sequence], chunk_size: int = 10_000,
+                       verbose: bool = False) -> BulkInsertResult:
+    return bulk_insert(engine, Guest.__table__, rows, GUEST_COLUMNS, chunk_size, _prepare_guest, verbose)
+
+
+def bulk_insert_bookings(engine: Engine, rows: Iterable[dict | Sequence], chunk_size: int = 10_000,
+                         verbose: bool = False) -> BulkInsertResult:
+    '''
+    Bookings inserted this way bypass the ORM events, reload an OccupancyIndex afterwards.
+    '''
+    return bulk_insert(engine, Booking.__table__, rows, BOOKING_COLUMNS, chunk_size, _prepare_booking, verbose)
+
+
+def _as_dict(row: dict | Sequence, columns: Sequence[str]) -> dict:
+    if isinstance(row, dict):
+        return row
+    return dict(zip(columns, row))
+
+
+def _prepare_guest(row: dict) -> dict:
+    # polymorphic discriminator, which the ORM would otherwise set
+    if "type" not in row:
+        row = {**row, "type": "guest"}
+    return row
+
+
+def _prepare_booking(row: dict) -> dict:
+    # the SQLite Date type only accepts date objects, rows read from files carry ISO strings
+    for column in ("start_date", "end_date", "booked_on"):
+        value = row.get(column)
+        if isinstance(value, str):
+            row = {**row, column: date.fromisoformat(value)}
+    return row
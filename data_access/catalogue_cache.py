@@ -0,0 +1,154 @@
+# read-through cache for the hotel catalogue (hotels with address and rooms), which changes rarely
+# entries are immutable snapshots, not ORM objects, so they can be shared between sessions and threads
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from data_models.models import *
+
+_ALL_HOTELS = "all"
+
+
+@dataclass(frozen=True, slots=True, repr=False)
+class AddressSnapshot:
+    id: int
+    street: str
+    zip: str
+    city: str
+
+    def __repr__(self) -> str:
+        return f"Address(id={self.id!r}, street={self.street!r}, city={self.city!r}, zip={self.zip!r})"
+
+
+@dataclass(frozen=True, slots=True)
+class RoomSnapshot:
+    hotel_id: int
+    number: str
+    type: str | None
+    max_guests: int
+    description: str | None
+    amenities: str | None
+    price: float
+
+
+@dataclass(frozen=True, slots=True, repr=False)
+class HotelSnapshot:
+    id: int
+    name: str
+    stars: int
+    address: AddressSnapshot
+    rooms: tuple[RoomSnapshot, ...]
+
+    def __repr__(self) -> str:
+        return f"Hotel(id={self.id!r}, name={self.name!r}, stars={self.stars}, address={self.address})"
+
+
+class CatalogueCache(object):
+    '''
+    LRU cache with time to live for hotel snapshots, per database (the URL the session is bound to).
+
+    Writers have to call invalidate() after committing changes to hotels, addresses or rooms. Changes made by
+    other processes are picked up at the latest after ttl seconds.
+    '''
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, int | str], tuple[float, object]] = OrderedDict()
+        self._databases: set[str] = set()
+        self._lock = threading.Lock()
+
+    def hotel(self, session: Session, hotel_id: int) -> HotelSnapshot | None:
+        key = (_database(session), hotel_id)
+        snapshot = self._get(key)
+        if snapshot is None:
+            snapshots = _load_hotels(session, Hotel.id == hotel_id)
+            snapshot = snapshots[0] if snapshots else None
+            if snapshot is not None:
+                self._put(key, snapshot)
+        return snapshot
+
+    def hotels(self, session: Session) -> tuple[HotelSnapshot, ...]:
+        database = _database(session)
+        snapshots = self._get((database, _ALL_HOTELS))
+        if snapshots is None:
+            snapshots = tuple(_load_hotels(session))
+            self._put((database, _ALL_HOTELS), snapshots)
+            for snapshot in snapshots[:self.maxsize - 1]:
+                self._put((database, snapshot.id), snapshot)
+        return snapshots
+
+    def invalidate(self, hotel_id: int | None = None):
+        # writers do not pass their database, the hotel is removed from the entries of every database
+        with self._lock:
+            if hotel_id is None:
+                self._entries.clear()
+                self._databases.clear()
+            else:
+                for database in self._databases:
+                    self._entries.pop((database, hotel_id), None)
+                    self._entries.pop((database, _ALL_HOTELS), None)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / requests if requests else 0.0,
+                "entries": len(self._entries), "maxsize": self.maxsize, "ttl": self.ttl}
+
+    def _get(self, key: tuple[str, int | str]):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _put(self, key: tuple[str, int | str], value):
+        with self._lock:
+            self._databases.add(key[0])
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def _database(session: Session) -> str:
+    return str(session.get_bind().url)
+
+
+def _load_hotels(session: Session, *conditions) -> List[HotelSnapshot]:
+    # two queries for any number of hotels: hotels with address, then their rooms
+    hotel_rows = session.execute(
+        select(Hotel.id, Hotel.name, Hotel.stars, Address.id, Address.street, Address.zip, Address.city)
+        .join(Hotel.address)
+        .where(*conditions)
+        .order_by(Hotel.id)
+    ).all()
+    rooms: dict[int, List[RoomSnapshot]] = {}
+    room_query = (
+        select(Room.hotel_id, Room.number, Room.type, Room.max_guests, Room.description, Room.amenities, Room.price)
+        .join(Room.hotel)
+        .where(*conditions)
+        .order_by(Room.hotel_id, Room.number)
+    )
+    for row in session.execute(room_query):
+        rooms.setdefault(row[0], []).append(RoomSnapshot(*row))
+    return [
+        HotelSnapshot(hotel_id, name, stars, AddressSnapshot(address_id, street, zip_code, city),
+                      tuple(rooms.get(hotel_id, ())))
+        for hotel_id, name, stars, address_id, street, zip_code, city in hotel_rows
+    ]
+
+
+# shared by the entry points of one process
+catalogue_cache = CatalogueCache()
@@ -1,24 +1,36 @@
 import os
 from pathlib import Path
 
-from sqlalchemy import create_engine
 from sqlalchemy.schema import CreateTable
 
 from data_models.models import *
 from data_access.data_generator import *
+from data_access.amenities import migrate_amenities
+from data_access import migrations
+from data_access.engine_factory import get_engine
 
-def init_db(file_path: str, create_ddl: bool = False, generate_example_data: bool = False, verbose: bool = False):
+
+def init_db(file_path: str, create_ddl: bool = False, generate_example_data: bool = False, verbose: bool = False,
+            reset: bool = False):
+    '''
+    Opens the database and applies missing schema migrations, an existing database keeps its data.
+    Example data is only generated if the database is new or reset=True wiped it.
+    '''
     path = Path(file_path)
     data_folder = path.parent
-    engine = create_engine(f"sqlite:///{file_path}")
+    engine = get_engine(file_path)
 
-    if path.is_file():
-        Base.metadata.drop_all(engine)
-    else:
+    is_new = not path.is_file()
+    if is_new:
         if not data_folder.exists():
             data_folder.mkdir(parents=True)
+    elif reset:
+        migrations.reset(engine)
+    elif migrations.is_current(engine):
+        # warm start, nothing to do
+        return
 
-    Base.metadata.create_all(engine)
+    migrations.migrate(engine, verbose=verbose)
 
     if create_ddl:
         with open(path.with_suffix(".ddl"), "w") as ddl_file:
@@ -26,10 +38,11 @@ def init_db(file_path: str, create_ddl: bool = False, generate_example_data: boo
                 create_table = str(CreateTable(table).compile(engine)).strip()
                 ddl_file.write(f"{create_table};{os.linesep}")
 
-    if generate_example_data:
+    if generate_example_data and (is_new or reset):
         generate_system_data(engine, verbose=verbose)
         generate_hotels(engine, verbose=verbose)
         generate_guests(engine, verbose=verbose)
         generate_registered_guests(engine, verbose=verbose)
         generate_random_bookings(engine, verbose=verbose)
-        generate_random_registered_bookings(engine, verbose=verbose)
\ No newline at end of file
+        generate_random_registered_bookings(engine, verbose=verbose)
+        migrate_amenities(engine)
@@ -1,14 +1,17 @@
 import datetime
 import sys
 from datetime import date
-from random import seed, choices
+from math import floor
+from random import seed, choices, random
 
 from sqlalchemy import Engine, select
 from sqlalchemy.orm import Session
 
+from data_access.query_stats import entry_point
 from data_models.models import *
 
 
+@entry_point("data_generator.generate_system_data")
 def generate_system_data(engine: Engine, verbose: bool = False) -> None:
     with Session(engine) as session:
         administrator = Role(name="administrator", access_level=sys.maxsize)
@@ -28,6 +31,7 @@ def generate_system_data(engine: Engine, verbose: bool = False) -> None:
             print(admin_login)
 
 
+@entry_point("data_generator.generate_hotels")
 def generate_hotels(engine: Engine, verbose: bool = False) -> None:
     with Session(engine) as session:
 
@@ -115,6 +119,7 @@ def generate_hotels(engine: Engine, verbose: bool = False) -> None:
                     print(f"{' ' * 5}{room}")
 
 
+@entry_point("data_generator.generate_guests")
 def generate_guests(engine: Engine, verbose):
     with Session(engine) as session:
         guests_to_add = [
@@ -160,6 +165,7 @@ def generate_guests(engine: Engine, verbose):
                 print(guest)
 
 
+@entry_point("data_generator.generate_registered_guests")
 def generate_registered_guests(engine: Engine, verbose):
     with Session(engine) as session:
         registered_guests_to_add = [
@@ -209,8 +215,9 @@ def generate_booking_dates(k: int = 20, s: int = 1):
     seed(s)
     start_of_year = date(date.today().year, 1, 1)
     end_of_year = date(date.today().year, 12, 31)
-    possible_days = [start_of_year + datetime.timedelta(days=x) for x in range((end_of_year - start_of_year).days + 1)]
-    start_day_choices = choices(possible_days, k=k)
+    # same draws as choices() over every day of the year, without building that list
+    number_of_days = (end_of_year - start_of_year).days + 1
+    start_day_choices = [start_of_year + datetime.timedelta(days=floor(random() * number_of_days)) for _ in range(k)]
 
     possible_durations = [1, 2, 3, 4, 5]
     duration_choices = choices(possible_durations, k=k)
@@ -220,6 +227,7 @@ def generate_booking_dates(k: int = 20, s: int = 1):
     return start_day_choices, end_day_choices
 
 
+@entry_point("data_generator.generate_random_bookings")
 def generate_random_bookings(engine: Engine, k: int = 20, s: int = 1, verbose: bool = False):
     seed(s)
     start_days, end_days = generate_booking_dates(k, s)
@@ -236,6 +244,8 @@ def generate_random_bookings(engine: Engine, k: int = 20, s: int = 1, verbose: b
             generate_hotels(engine)
             possible_rooms = session.query(Room).all()
         room_choices = choices(possible_rooms, k=k)
+        # booked up to three months before arrival
+        lead_times = choices(range(91), k=k)
 
         bookings_to_add = []
         for i in range(k):
@@ -245,7 +255,8 @@ def generate_random_bookings(engine: Engine, k: int = 20, s: int = 1, verbose: b
                     guest=guest_choices[i],
                     number_of_guests=1,
                     start_date=start_days[i],
-                    end_date=end_days[i]
+                    end_date=end_days[i],
+                    booked_on=start_days[i] - datetime.timedelta(days=lead_times[i])
                 )
             )
         session.add_all(bookings_to_add)
@@ -258,6 +269,7 @@ def generate_random_bookings(engine: Engine, k: int = 20, s: int = 1, verbose: b
                 print(booking)
 
 
+@entry_point("data_generator.generate_random_registered_bookings")
 def generate_random_registered_bookings(engine: Engine, k: int = 5, s: int = 1, verbose: bool = False):
     seed(s)
     start_days, end_days = generate_booking_dates(k, s)
@@ -273,6 +285,7 @@ def generate_random_registered_bookings(engine: Engine, k: int = 5, s: int = 1,
             generate_hotels(engine)
             possible_rooms = session.query(Room).all()
         room_choices = choices(possible_rooms, k=k)
+        lead_times = choices(range(91), k=k)
         registered_bookings_to_add = []
         for i in range(k):
             registered_bookings_to_add.append(
@@ -281,7 +294,8 @@ def generate_random_registered_bookings(engine: Engine, k: int = 5, s: int = 1,
                     guest=registered_guest_choices[i],
                     number_of_guests=1,
                     start_date=start_days[i],
-                    end_date=end_days[i]
+                    end_date=end_days[i],
+                    booked_on=start_days[i] - datetime.timedelta(days=lead_times[i])
                 )
             )
         session.add_all(registered_bookings_to_add)
@@ -1,13 +1,14 @@
 import os
 from pathlib import Path
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 
 from sqlalchemy.schema import CreateTable
 
 from data_models.models import *
 
+from data_access.amenities import migrate_amenities
+from data_access.engine_factory import get_engine
 from data_access.data_generator import generate_hotels, generate_guests, generate_registered_guests, generate_random_bookings, \
     generate_random_registered_bookings
 
@@ -16,7 +17,7 @@ def load_data_from_sqlite():
     data_path = Path(os.getcwd()).joinpath("data")
     data_path.mkdir(exist_ok=True)
 
-    engine = create_engine("sqlite:///data/example.data_access")
+    engine = get_engine("data/example.data_access")
     with open(data_path.joinpath("example.ddl"), "w") as ddl_file:
         for table in Base.metadata.tables.values():
             create_table = str(CreateTable(table).compile(engine)).strip()
@@ -26,14 +27,15 @@ def load_data_from_sqlite():
     Base.metadata.create_all(engine)
 
     generate_hotels(engine)
+    migrate_amenities(engine)
     with Session(engine) as session:
         result = session.query(Hotel).all()
         for hotel in result:
             print(f"{hotel}")
             for room in hotel.rooms:
                 print(f"{' ' * 5}{room}")
-                for amenity in room.amenities:
-                    print(f"{' ' * 10}{amenity}")
+                for amenity in room.amenity_list:
+                    print(f"{' ' * 10}{amenity.name}")
 
     print()
     print("#" * 20 + "Guests" + "#" * 20)
@@ -0,0 +1,171 @@
+# one shared, tuned engine per database file instead of a create_engine() call in every entry point
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Connection, Engine, create_engine, event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, SingletonThreadPool, StaticPool
+
+from data_access.query_stats import instrument, query_stats
+
+if TYPE_CHECKING:
+    # imported on the first asyncio engine only, the GUI and console entry points never need it
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+# applied to every new connection; WAL lets readers run next to the single writer, NORMAL only syncs at
+# checkpoints in WAL mode, mmap_size and cache_size (negative = KiB) keep hot pages in memory and
+# busy_timeout lets writers wait for the lock instead of failing immediately
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+
+_engines: dict[tuple[str, bool], Engine] = {}
+_async_engines: dict[tuple[str, bool], AsyncEngine] = {}
+_engines_lock = threading.Lock()
+# connects and checkouts per engine, the pool object itself is replaced by Engine.dispose()
+_pool_counters: WeakKeyDictionary[Engine, dict[str, int]] = WeakKeyDictionary()
+
+
+def get_engine(file_path: str, echo: bool = False) -> Engine:
+    '''
+    Returns the shared engine of a database file, it is created on the first call.
+    '''
+    key = (_normalise(file_path), echo)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = create_sqlite_engine(file_path, echo=echo)
+            _enable_query_stats(engine)
+        return engine
+
+
+def create_sqlite_engine(file_path: str, echo: bool = False, pool_size: int = 5, max_overflow: int = 10,
+                         pragmas: dict | None = None) -> Engine:
+    if file_path == ":memory:":
+        # every connection would be a new, empty in-memory database, so there is one per thread
+        engine = create_engine("sqlite://", echo=echo, poolclass=SingletonThreadPool)
+    else:
+        engine = create_engine(f"sqlite:///{file_path}", echo=echo, poolclass=QueuePool, pool_size=pool_size,
+                               max_overflow=max_overflow, connect_args={"check_same_thread": False})
+    _tune_connections(engine, SQLITE_PRAGMAS if pragmas is None else pragmas)
+    return enable_sqlite_transactions(engine)
+
+
+def get_async_engine(file_path: str, echo: bool = False) -> AsyncEngine:
+    '''
+    Returns the shared asyncio engine (aiosqlite) of a database file, it is created on the first call.
+    '''
+    key = (_normalise(file_path), echo)
+    with _engines_lock:
+        engine = _async_engines.get(key)
+        if engine is None:
+            engine = _async_engines[key] = create_async_sqlite_engine(file_path, echo=echo)
+            _enable_query_stats(engine.sync_engine)
+        return engine
+
+
+def create_async_sqlite_engine(file_path: str, echo: bool = False, pool_size: int = 5, max_overflow: int = 10,
+                               pragmas: dict | None = None) -> AsyncEngine:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    # aiosqlite runs every connection in its own thread, so the number of threads is bounded by the pool and not
+    # by the number of concurrent requests; waiting for a pooled connection does not block the event loop
+    if file_path == ":memory:":
+        engine = create_async_engine("sqlite+aiosqlite://", echo=echo, poolclass=StaticPool)
+    else:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{file_path}", echo=echo,
+                                     poolclass=AsyncAdaptedQueuePool, pool_size=pool_size, max_overflow=max_overflow)
+    _tune_connections(engine.sync_engine, SQLITE_PRAGMAS if pragmas is None else pragmas)
+    enable_sqlite_transactions(engine.sync_engine)
+    return engine
+
+
+def _tune_connections(engine: Engine, pragmas: dict):
+    counters = _pool_counters[engine] = {"connects": 0, "checkouts": 0}
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        counters["connects"] += 1
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    @event.listens_for(engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+
+
+def pool_statistics(engine: Engine | AsyncEngine) -> dict:
+    # an AsyncEngine is a proxy of its sync_engine
+    engine = getattr(engine, "sync_engine", engine)
+    pool = engine.pool
+    statistics = {"pool": type(pool).__name__, "status": pool.status()}
+    statistics.update(_pool_counters.get(engine, {}))
+    if isinstance(pool, QueuePool):
+        statistics.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                          overflow=pool.overflow())
+    return statistics
+
+
+def dispose_engines():
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+async def dispose_async_engines():
+    with _engines_lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
+def enable_sqlite_transactions(engine: Engine) -> Engine:
+    # pysqlite starts transactions on its own and always as deferred BEGIN. Let SQLAlchemy emit BEGIN instead,
+    # then connections with the execution option sqlite_immediate=True start with BEGIN IMMEDIATE and take the
+    # write lock before their first read.
+    if not event.contains(engine, "connect", _disable_pysqlite_transactions):
+        event.listen(engine, "connect", _disable_pysqlite_transactions)
+        event.listen(engine, "begin", _begin_sqlite_transaction)
+        engine.dispose()
+    return engine
+
+
+def sqlite_transactions_enabled(engine: Engine) -> bool:
+    # engines of this module always are; sqlite_immediate=True has no effect on other engines
+    return event.contains(engine, "connect", _disable_pysqlite_transactions)
+
+
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+def _begin_sqlite_transaction(connection: Connection):
+    if connection.get_execution_options().get("sqlite_immediate", False):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        connection.exec_driver_sql("BEGIN")
+
+
+def _enable_query_stats(engine: Engine):
+    # QUERY_STATS=1 reports on stderr at exit, any other value is the file the report is written to
+    setting = os.environ.get("QUERY_STATS")
+    if setting:
+        instrument(engine)
+        query_stats.report_at_exit(None if setting == "1" else setting)
+
+
+def _normalise(file_path: str) -> str:
+    return file_path if file_path == ":memory:" else str(Path(file_path).resolve())
@@ -0,0 +1,176 @@
+# streaming exports of bookings, guests and per-hotel (and per-day) occupancy to CSV or Parquet
+# flat Core selects are fetched in batches from a streaming cursor and written batch by batch, so the memory
+# used does not depend on the size of the tables
+import csv
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import Date, Engine, Float, Integer, Select, cast, func, select
+
+from data_access.occupancy_summary import daily_occupancy_query
+from data_models.models import *
+
+FORMATS = ("csv", "parquet")
+
+
+class ExportResult(object):
+    def __init__(self, name: str, path: Path, rows: int = 0, seconds: float = 0.0):
+        self.name = name
+        self.path = path
+        self.rows = rows
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (f"ExportResult(name={self.name!r}, path={str(self.path)!r}, rows={self.rows!r}, "
+                f"seconds={self.seconds:.3f}, rows_per_second={self.rows_per_second:.0f})")
+
+
+def bookings_query(start: date | None = None, end: date | None = None) -> Select:
+    # one row per booking with hotel, room, guest and amount; with start/end only bookings beginning in [start, end)
+    nights = cast(func.julianday(Booking.end_date) - func.julianday(Booking.start_date), Integer)
+    query = (
+        select(Booking.id.label("booking_id"), Hotel.id.label("hotel_id"), Hotel.name.label("hotel_name"),
+               Booking.room_number, Room.type.label("room_type"), Booking.guest_id,
+               Guest.firstname.label("guest_firstname"), Guest.lastname.label("guest_lastname"),
+               Booking.number_of_guests, Booking.start_date, Booking.end_date, nights.label("nights"),
+               Room.price.label("price_per_night"), cast(nights * Room.price, Float).label("amount"), Booking.comment,
+               Booking.booked_on)
+        .join(Booking.room)
+        .join(Room.hotel)
+        .join(Booking.guest)
+        .order_by(Booking.id)
+    )
+    if start is not None:
+        query = query.where(Booking.start_date >= start)
+    if end is not None:
+        query = query.where(Booking.start_date < end)
+    return query
+
+
+def guests_query() -> Select:
+    return (
+        select(Guest.id.label("guest_id"), Guest.firstname, Guest.lastname, Guest.email, Guest.type,
+               Address.street, Address.zip, Address.city)
+        .outerjoin(Guest.address)
+        .order_by(Guest.id)
+    )
+
+
+def occupancy_query(start: date, end: date) -> Select:
+    '''
+    One row per hotel: rooms, room nights in [start, end), booked nights in that period, occupancy and revenue.
+    Bookings crossing the period boundaries only count with their nights inside the period.
+    '''
+    first_night = func.max(Booking.start_date, start)
+    last_night = func.min(Booking.end_date, end)
+    nights = func.julianday(last_night) - func.julianday(first_night)
+    booked = (
+        select(Booking.room_hotel_id.label("hotel_id"), func.count().label("bookings"),
+               func.sum(nights).label("nights"), func.sum(nights * Room.price).label("revenue"))
+        .join(Booking.room)
+        .where(Booking.start_date < end)
+        .where(Booking.end_date > start)
+        .group_by(Booking.room_hotel_id)
+        .subquery()
+    )
+    rooms = select(Room.hotel_id, func.count().label("rooms")).group_by(Room.hotel_id).subquery()
+    days = (end - start).days
+    room_nights = func.coalesce(rooms.c.rooms, 0) * days
+    booked_nights = cast(func.coalesce(booked.c.nights, 0), Integer)
+    return (
+        select(Hotel.id.label("hotel_id"), Hotel.name.label("hotel_name"), Address.city,
+               func.coalesce(rooms.c.rooms, 0).label("rooms"), room_nights.label("room_nights"),
+               func.coalesce(booked.c.bookings, 0).label("bookings"), booked_nights.label("booked_nights"),
+               cast(func.coalesce(booked_nights * 1.0 / func.nullif(room_nights, 0), 0.0), Float)
+               .label("occupancy"),
+               cast(func.coalesce(booked.c.revenue, 0.0), Float).label("revenue"))
+        .join(Hotel.address)
+        .outerjoin(rooms, rooms.c.hotel_id == Hotel.id)
+        .outerjoin(booked, booked.c.hotel_id == Hotel.id)
+        .order_by(Hotel.id)
+    )
+
+
+def export_query(engine: Engine, query: Select, path: str | os.PathLike, file_format: str = "csv",
+                 batch_size: int = 10_000, name: str | None = None) -> ExportResult:
+    if file_format not in FORMATS:
+        raise ValueError(f"unknown format {file_format!r}, expected one of {FORMATS}")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    result = ExportResult(name or path.stem, path)
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        rows = connection.execution_options(yield_per=batch_size).execute(query)
+        batches = rows.partitions()
+        if file_format == "csv":
+            result.rows = _write_csv(path, list(rows.keys()), batches)
+        else:
+            result.rows = _write_parquet(path, query, batches)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def export_bookings(engine: Engine, path: str | os.PathLike, file_format: str = "csv", start: date | None = None,
+                    end: date | None = None, batch_size: int = 10_000) -> ExportResult:
+    return export_query(engine, bookings_query(start, end), path, file_format, batch_size, "bookings")
+
+
+def export_guests(engine: Engine, path: str | os.PathLike, file_format: str = "csv",
+                  batch_size: int = 10_000) -> ExportResult:
+    return export_query(engine, guests_query(), path, file_format, batch_size, "guests")
+
+
+def export_occupancy(engine: Engine, path: str | os.PathLike, start: date, end: date, file_format: str = "csv",
+                     batch_size: int = 10_000) -> ExportResult:
+    if end <= start:
+        raise ValueError("end must be after start")
+    return export_query(engine, occupancy_query(start, end), path, file_format, batch_size, "occupancy")
+
+
+def export_daily_occupancy(engine: Engine, path: str | os.PathLike, start: date, end: date, file_format: str = "csv",
+                           batch_size: int = 10_000) -> ExportResult:
+    # read from the occupancy summary, one row per hotel and day with bookings
+    if end <= start:
+        raise ValueError("end must be after start")
+    return export_query(engine, daily_occupancy_query(start, end), path, file_format, batch_size, "daily_occupancy")
+
+
+def _write_csv(path: Path, columns: List[str], batches: Iterator) -> int:
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def _write_parquet(path: Path, query: Select, batches: Iterator) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as err:
+        raise ImportError("writing Parquet files requires pyarrow (pip install pyarrow)") from err
+    # the schema comes from the column types of the query, a batch with only NULLs in a column must not change it
+    arrow_types = {Integer: pa.int64(), Float: pa.float64(), Date: pa.date32()}
+    schema = pa.schema([
+        (column.name, next((arrow_type for sql_type, arrow_type in arrow_types.items()
+                            if isinstance(column.type, sql_type)), pa.string()))
+        for column in query.selected_columns
+    ])
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            columns = zip(*batch)
+            writer.write_table(pa.Table.from_arrays([pa.array(values, field.type)
+                                                     for values, field in zip(columns, schema)], schema=schema))
+            rows += len(batch)
+    return rows
@@ -0,0 +1,130 @@
+# full text search over hotels with an SQLite FTS5 table
+# one document per hotel (rowid = hotel.id) with name, city, street and the text of its rooms,
+# kept in sync by triggers on hotel, address and room
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import ColumnElement, Connection, Engine, Select, column, false, func, literal_column, select, table
+
+from data_models.models import *
+
+hotel_fts = table("hotel_fts", column("rowid"), column("name"), column("city"), column("street"), column("rooms"))
+
+# bm25 weights of the columns name, city, street, rooms
+RANK_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+_ROOMS_TEXT = (
+    "(SELECT group_concat(coalesce(r.type, '') || ' ' || coalesce(r.description, '') || ' ' || "
+    "coalesce(r.amenities, ''), ' ') FROM room r WHERE r.hotel_id = {hotel_id})"
+)
+
+_HOTEL_DOCUMENT = (
+    "INSERT INTO hotel_fts(rowid, name, city, street, rooms) "
+    "SELECT {hotel}.id, {hotel}.name, a.city, a.street, " + _ROOMS_TEXT.format(hotel_id="{hotel}.id") + " "
+)
+
+_INSERT_HOTEL = _HOTEL_DOCUMENT + "FROM address a WHERE a.id = {hotel}.address_id"
+
+_INSERT_ALL_HOTELS = _HOTEL_DOCUMENT.format(hotel="h") + "FROM hotel h JOIN address a ON a.id = h.address_id"
+
+FULLTEXT_DDL = [
+    # diacritics are removed, so "zurich" finds "Zürich"; prefix indexes make short prefix queries cheap
+    "CREATE VIRTUAL TABLE IF NOT EXISTS hotel_fts USING fts5("
+    "name, city, street, rooms, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_fts_hotel_insert AFTER INSERT ON hotel BEGIN "
+    + _INSERT_HOTEL.format(hotel="NEW") + "; END",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_fts_hotel_update AFTER UPDATE ON hotel BEGIN "
+    "DELETE FROM hotel_fts WHERE rowid = OLD.id; "
+    + _INSERT_HOTEL.format(hotel="NEW") + "; END",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_fts_hotel_delete AFTER DELETE ON hotel BEGIN "
+    "DELETE FROM hotel_fts WHERE rowid = OLD.id; END",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_fts_address_update AFTER UPDATE OF street, city ON address BEGIN "
+    "UPDATE hotel_fts SET street = NEW.street, city = NEW.city "
+    "WHERE rowid IN (SELECT id FROM hotel WHERE address_id = NEW.id); END",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_fts_room_insert AFTER INSERT ON room BEGIN "
+    "UPDATE hotel_fts SET rooms = " + _ROOMS_TEXT.format(hotel_id="NEW.hotel_id") + " "
+    "WHERE rowid = NEW.hotel_id; END",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_fts_room_update AFTER UPDATE OF hotel_id, type, description, amenities "
+    "ON room BEGIN "
+    "UPDATE hotel_fts SET rooms = " + _ROOMS_TEXT.format(hotel_id="OLD.hotel_id") + " "
+    "WHERE rowid = OLD.hotel_id; "
+    "UPDATE hotel_fts SET rooms = " + _ROOMS_TEXT.format(hotel_id="NEW.hotel_id") + " "
+    "WHERE rowid = NEW.hotel_id; END",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_fts_room_delete AFTER DELETE ON room BEGIN "
+    "UPDATE hotel_fts SET rooms = " + _ROOMS_TEXT.format(hotel_id="OLD.hotel_id") + " "
+    "WHERE rowid = OLD.hotel_id; END",
+]
+
+
+def create_fulltext_index(bind: Engine | Connection):
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            return create_fulltext_index(connection)
+    for statement in FULLTEXT_DDL:
+        bind.exec_driver_sql(statement)
+    rebuild_fulltext_index(bind)
+
+
+def drop_fulltext_index(connection: Connection):
+    # the triggers are defined on hotel, address and room, they would write to the dropped table
+    _drop_triggers(connection)
+    connection.exec_driver_sql("DROP TABLE IF EXISTS hotel_fts")
+
+
+@contextmanager
+def fulltext_sync_suspended(engine: Engine):
+    # for bulk loads: updating the index row by row from the triggers is much slower than one rebuild at the end
+    with engine.begin() as connection:
+        _drop_triggers(connection)
+    try:
+        yield
+    finally:
+        create_fulltext_index(engine)
+
+
+def rebuild_fulltext_index(connection: Connection):
+    connection.exec_driver_sql("DELETE FROM hotel_fts")
+    connection.exec_driver_sql(_INSERT_ALL_HOTELS)
+
+
+def _drop_triggers(connection: Connection):
+    for (trigger,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'hotel_fts_%'").all():
+        connection.exec_driver_sql(f"DROP TRIGGER {trigger}")
+
+
+def match_expression(text: str) -> str | None:
+    # every word of the input has to match as prefix, e.g. "zur cent" -> "zur"* "cent"*
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _matches(text: str) -> ColumnElement[bool]:
+    expression = match_expression(text)
+    if expression is None:
+        return false()
+    return literal_column("hotel_fts").op("MATCH")(expression)
+
+
+def matching_hotel_ids(text: str) -> Select:
+    return select(hotel_fts.c.rowid).where(_matches(text))
+
+
+def ranked_hotels_query(text: str, limit: int = 20) -> Select:
+    rank = func.bm25(literal_column("hotel_fts"), *RANK_WEIGHTS)
+    return (
+        select(Hotel)
+        .join(hotel_fts, hotel_fts.c.rowid == Hotel.id)
+        .where(_matches(text))
+        .order_by(rank)
+        .limit(limit)
+    )
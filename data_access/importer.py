@@ -0,0 +1,259 @@
+# streaming import of hotels with their rooms and of guests from CSV or JSON lines files
+# records are checked with the same rules as the GUI form, addresses are deduplicated against the database and
+# within the file, and every chunk of records is inserted in one transaction. Rejected records are written to a
+# JSON lines file together with the reason.
+#
+# hotels, CSV:   one line per room, consecutive lines of the same hotel (name and address) form one hotel
+#                name,stars,street,zip,city,room_number,room_type,max_guests,description,amenities,price
+# hotels, JSONL: {"name", "stars", "street", "zip", "city" (or "address": {...}), "rooms": [{"number", "type",
+#                "max_guests", "description", "amenities", "price"}]}
+# guests:        firstname,lastname,email,street,zip,city (CSV header or JSONL keys)
+import csv
+import json
+import os
+import time
+from itertools import groupby, islice
+from pathlib import Path
+from typing import Callable, Iterator
+
+from sqlalchemy import Connection, Engine, insert, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+
+from data_access.amenities import link_amenities, parse_amenities
+from data_access.catalogue_cache import catalogue_cache
+from data_models.models import *
+from data_models.validation import CITY_PATTERN, EMAIL_PATTERN, HOTEL_NAME_PATTERN, STARS, STREET_PATTERN, \
+    ZIP_PATTERN, ValidationError, check_number, check_pattern, check_required
+
+FORMATS = ("csv", "jsonl")
+
+# addresses looked up per query, three parameters each
+_LOOKUP_SIZE = 300
+
+
+class ImportResult(object):
+    def __init__(self, kind: str, path: Path):
+        self.kind = kind
+        self.path = path
+        self.accepted = 0
+        self.rejected = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.rejects_path: Path | None = None
+
+    @property
+    def rows_per_second(self) -> float:
+        # inserted database rows (addresses, hotels, rooms, guests) per second
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __repr__(self) -> str:
+        return (f"ImportResult(kind={self.kind!r}, accepted={self.accepted!r}, rejected={self.rejected!r}, "
+                f"rows={self.rows!r}, seconds={self.seconds:.3f}, rows_per_second={self.rows_per_second:.0f}, "
+                f"rejects_path={str(self.rejects_path) if self.rejects_path else None!r})")
+
+
+def read_records(path: str | os.PathLike, file_format: str | None = None) -> Iterator[tuple[int, dict]]:
+    '''
+    Yields (line number, record) one at a time. A JSON line that cannot be parsed is yielded as a record with
+    an "_error" key, so it is rejected like any other invalid record.
+    '''
+    path = Path(path)
+    file_format = file_format or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+    if file_format not in FORMATS:
+        raise ValueError(f"unknown format {file_format!r}, expected one of {FORMATS}")
+    with open(path, newline="" if file_format == "csv" else None, encoding="utf-8-sig") as input_file:
+        if file_format == "csv":
+            reader = csv.DictReader(input_file)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(input_file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as err:
+                    record = {"_error": f"invalid JSON: {err}", "_line": line.rstrip("\n")}
+                yield line_number, record if isinstance(record, dict) else {"_error": "not a JSON object",
+                                                                            "_line": line.rstrip("\n")}
+
+
+class Importer(object):
+    def __init__(self, engine: Engine, chunk_size: int = 1000, rejects_path: str | os.PathLike | None = None):
+        self._engine = engine
+        self._chunk_size = chunk_size
+        self._rejects_path = Path(rejects_path) if rejects_path else None
+        # normalised (street, zip, city) -> address id, of this import and of existing addresses already looked up
+        self._addresses: dict[tuple[str, str, str], int] = {}
+        # addresses inserted by the current transaction
+        self._new_addresses: List[tuple[str, str, str]] = []
+
+    def import_hotels(self, path: str | os.PathLike, file_format: str | None = None) -> ImportResult:
+        records = read_records(path, file_format)
+        if (file_format or Path(path).suffix.lower().lstrip(".")) == "csv":
+            records = _hotels_from_room_lines(records)
+        result = self._run("hotels", Path(path), records, _validate_hotel, self._insert_hotels)
+        catalogue_cache.invalidate()
+        return result
+
+    def import_guests(self, path: str | os.PathLike, file_format: str | None = None) -> ImportResult:
+        return self._run("guests", Path(path), read_records(path, file_format), _validate_guest,
+                         self._insert_guests)
+
+    def _run(self, kind: str, path: Path, records: Iterator[tuple[int, dict]], validate: Callable[[dict], dict],
+             insert_chunk: Callable[[Connection, List[dict]], int]) -> ImportResult:
+        result = ImportResult(kind, path)
+        rejects_path = self._rejects_path or path.with_name(f"{path.stem}.rejects.jsonl")
+        rejects_file = None
+        started = time.perf_counter()
+        try:
+            while chunk := list(islice(records, self._chunk_size)):
+                valid, valid_records, rejects = [], [], []
+                for line, record in chunk:
+                    try:
+                        valid.append(validate(record))
+                        valid_records.append((line, record))
+                    except ValidationError as err:
+                        rejects.append((line, str(err), record))
+                if valid:
+                    try:
+                        result.rows += self._insert(insert_chunk, valid)
+                        result.accepted += len(valid)
+                    except SQLAlchemyError as err:
+                        # the whole chunk was rolled back, its records are rejected with the database error
+                        rejects.extend((line, f"database error: {getattr(err, 'orig', None) or err}", record)
+                                       for line, record in valid_records)
+                if rejects:
+                    if rejects_file is None:
+                        rejects_file = open(rejects_path, "w", encoding="utf-8")
+                        result.rejects_path = rejects_path
+                    for line, error, record in rejects:
+                        rejects_file.write(json.dumps({"line": line, "error": error, "record": record},
+                                                      ensure_ascii=False, default=str) + "\n")
+                    result.rejected += len(rejects)
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+            result.seconds = time.perf_counter() - started
+        return result
+
+    def _insert(self, insert_chunk: Callable[[Connection, List[dict]], int], entries: List[dict]) -> int:
+        self._new_addresses = []
+        try:
+            with self._engine.connect() as connection:
+                connection.execution_options(sqlite_immediate=True)
+                with connection.begin():
+                    return insert_chunk(connection, entries)
+        except SQLAlchemyError:
+            # addresses inserted by the failed transaction do not exist
+            for key in self._new_addresses:
+                del self._addresses[key]
+            raise
+
+    def _address_ids(self, connection: Connection, keys: List[tuple[str, str, str]]) -> tuple[List[int], int]:
+        # ids of the addresses in the same order, new addresses are inserted; returns the number inserted too
+        unknown = list(dict.fromkeys(key for key in keys if key not in self._addresses))
+        for i in range(0, len(unknown), _LOOKUP_SIZE):
+            lookup = unknown[i:i + _LOOKUP_SIZE]
+            query = (select(Address.id, Address.street, Address.zip, Address.city)
+                     .where(tuple_(Address.street, Address.zip, Address.city).in_(lookup)))
+            for address_id, *key in connection.execute(query):
+                self._addresses.setdefault(tuple(key), address_id)
+        new = [key for key in unknown if key not in self._addresses]
+        if new:
+            ids = connection.execute(
+                insert(Address).returning(Address.id, sort_by_parameter_order=True),
+                [{"street": street, "zip": zip_code, "city": city} for street, zip_code, city in new],
+            ).scalars().all()
+            self._addresses.update(zip(new, ids))
+            self._new_addresses.extend(new)
+        return [self._addresses[key] for key in keys], len(new)
+
+    def _insert_hotels(self, connection: Connection, hotels: List[dict]) -> int:
+        address_ids, new_addresses = self._address_ids(connection, [hotel["address"] for hotel in hotels])
+        hotel_ids = connection.execute(
+            insert(Hotel).returning(Hotel.id, sort_by_parameter_order=True),
+            [{"name": hotel["name"], "stars": hotel["stars"], "address_id": address_id}
+             for hotel, address_id in zip(hotels, address_ids)],
+        ).scalars().all()
+        rooms = [{"hotel_id": hotel_id, **room} for hotel, hotel_id in zip(hotels, hotel_ids) for room in hotel["rooms"]]
+        if rooms:
+            connection.execute(insert(Room), rooms)
+            link_amenities(connection, [(room["hotel_id"], room["number"], room["amenities"]) for room in rooms])
+        return new_addresses + len(hotels) + len(rooms)
+
+    def _insert_guests(self, connection: Connection, guests: List[dict]) -> int:
+        address_ids, new_addresses = self._address_ids(connection, [guest["address"] for guest in guests])
+        connection.execute(insert(Guest.__table__), [
+            {"firstname": guest["firstname"], "lastname": guest["lastname"], "email": guest["email"],
+             "address_id": address_id, "type": "guest"}
+            for guest, address_id in zip(guests, address_ids)
+        ])
+        return new_addresses + len(guests)
+
+
+def _hotels_from_room_lines(lines: Iterator[tuple[int, dict]]) -> Iterator[tuple[int, dict]]:
+    # consecutive CSV lines with the same hotel name and address are one hotel with several rooms
+    def hotel_key(line: tuple[int, dict]):
+        record = line[1]
+        return tuple((record.get(field) or "").strip() for field in ("name", "street", "zip", "city"))
+
+    for _, group in groupby(lines, hotel_key):
+        group = list(group)
+        first_line, first = group[0]
+        hotel = {field: first.get(field) for field in ("name", "stars", "street", "zip", "city")}
+        hotel["rooms"] = [
+            {"number": record.get("room_number"), "type": record.get("room_type"),
+             "max_guests": record.get("max_guests"), "description": record.get("description"),
+             "amenities": record.get("amenities"), "price": record.get("price")}
+            for _, record in group if (record.get("room_number") or "").strip()
+        ]
+        yield first_line, hotel
+
+
+def _validate_address(record: dict) -> tuple[str, str, str]:
+    address = record.get("address") if isinstance(record.get("address"), dict) else record
+    return (" ".join(check_pattern(address.get("street"), STREET_PATTERN, "street").split()),
+            check_pattern(address.get("zip"), ZIP_PATTERN, "zip"),
+            check_pattern(address.get("city"), CITY_PATTERN, "city"))
+
+
+def _validate_hotel(record: dict) -> dict:
+    if "_error" in record:
+        raise ValidationError(record["_error"])
+    stars = check_number(record.get("stars"), "stars", STARS.start)
+    if stars not in STARS:
+        raise ValidationError(f"stars must be between {STARS.start} and {STARS.stop - 1}")
+    rooms, numbers = [], set()
+    room_records = record.get("rooms") or []
+    if not isinstance(room_records, list):
+        raise ValidationError("rooms must be a list")
+    for room in room_records:
+        if not isinstance(room, dict):
+            raise ValidationError(f"room {room!r} must be an object")
+        number = check_required(room.get("number"), "room number")
+        if number in numbers:
+            raise ValidationError(f"room number {number!r} occurs more than once")
+        numbers.add(number)
+        amenities = room.get("amenities")
+        if isinstance(amenities, list):
+            amenities = ", ".join(str(name) for name in amenities)
+        rooms.append({
+            "number": number,
+            "type": (room.get("type") or "").strip() or None,
+            "max_guests": check_number(room.get("max_guests"), f"max_guests of room {number}", 1),
+            "description": (room.get("description") or "").strip() or None,
+            "amenities": ", ".join(parse_amenities(amenities)) or None,
+            "price": check_number(room.get("price"), f"price of room {number}", 0, float),
+        })
+    return {"name": " ".join(check_pattern(record.get("name"), HOTEL_NAME_PATTERN, "name").split()),
+            "stars": stars, "address": _validate_address(record), "rooms": rooms}
+
+
+def _validate_guest(record: dict) -> dict:
+    if "_error" in record:
+        raise ValidationError(record["_error"])
+    return {"firstname": check_required(record.get("firstname"), "firstname"),
+            "lastname": check_required(record.get("lastname"), "lastname"),
+            "email": check_pattern(record.get("email"), EMAIL_PATTERN, "email"),
+            "address": _validate_address(record)}
@@ -0,0 +1,291 @@
+# synthetic data for load tests and capacity planning: N hotels with M rooms each, G guests and B bookings
+# all rows are produced as streams of tuples and written through the bulk insert path, to CSV or to Parquet
+import csv
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from itertools import chain, islice
+from pathlib import Path
+from random import Random
+from typing import Iterator
+
+from sqlalchemy import Engine, func, select
+
+from data_access.amenities import migrate_amenities
+from data_access.bulk_insert import bulk_insert, bulk_insert_prepared, BulkInsertResult
+from data_access.data_base import init_db
+from data_access.engine_factory import get_engine
+from data_access.fulltext import fulltext_sync_suspended
+from data_access.occupancy_summary import occupancy_summary_suspended
+from data_models.models import *
+
+# every block of entities gets its own random generator, so a row only depends on the seed and its id,
+# no matter how the rows are split into chunks or shards; bookings have one generator per hotel, as there are
+# few hotels with many bookings each
+BLOCK_SIZE = 1000
+
+CITIES = [
+    ("Aarau", "5000"), ("Basel", "4051"), ("Bern", "3011"), ("Biel", "2502"), ("Chur", "7000"),
+    ("Fribourg", "1700"), ("Geneva", "1201"), ("Lausanne", "1003"), ("Lucerne", "6003"), ("Lugano", "6900"),
+    ("Olten", "4600"), ("Schaffhausen", "8200"), ("Sion", "1950"), ("Thun", "3600"), ("Winterthur", "8400"),
+    ("Zug", "6300"), ("Zurich", "8001"),
+]
+STREETS = ["Bahnhofstrasse", "Hauptstrasse", "Dorfstrasse", "Seestrasse", "Kirchweg", "Schulstrasse",
+           "Industriestrasse", "Bergstrasse", "Poststrasse", "Gartenstrasse", "Rosenweg", "Waldstrasse"]
+HOTEL_NAMES = ["Alpina", "Bellevue", "Central", "Continental", "Edelweiss", "Krone", "Linde", "Metropol",
+               "National", "Panorama", "Rigihof", "Schweizerhof", "Seeblick", "Sonne", "Storchen"]
+FIRSTNAMES = ["Anna", "Bettina", "Claudia", "Daniel", "Eva", "Felix", "Hans", "Laura", "Lukas", "Marco",
+              "Nina", "Peter", "Sabrina", "Sandra", "Thomas", "Urs"]
+LASTNAMES = ["Becker", "Braun", "Fischer", "Frei", "Gerber", "Keller", "Meier", "Müller", "Schmid", "Schmidt",
+             "Steiner", "Weber", "Wyss", "Zimmermann"]
+ROOM_TYPES = [
+    # type, max_guests, description, base price
+    ("single room", 1, "One single bed", 110.0),
+    ("double room", 2, "One double bed", 140.0),
+    ("double room", 2, "Two single beds", 135.0),
+    ("double room", 2, "One queensized bed", 165.0),
+    ("family room", 4, "One queensized bed and two single beds", 220.0),
+    ("suite", 4, "Suite", 260.0),
+]
+AMENITIES = ["TV", "Caffe Machine", "Minibar", "Balcony", "Safe", "Bathtub", "Air Condition"]
+
+ADDRESS_COLUMNS = ("id", "street", "zip", "city")
+HOTEL_COLUMNS = ("id", "name", "stars", "address_id")
+ROOM_COLUMNS = ("hotel_id", "number", "type", "max_guests", "description", "amenities", "price")
+GUEST_COLUMNS = ("id", "firstname", "lastname", "email", "address_id", "type")
+BOOKING_COLUMNS = ("room_hotel_id", "room_number", "guest_id", "number_of_guests", "start_date", "end_date",
+                   "booked_on")
+
+# table -> columns and row iterator of LoadTestDataset, in insert order
+TABLES = {
+    "address": (ADDRESS_COLUMNS, "addresses"),
+    "hotel": (HOTEL_COLUMNS, "hotel_rows"),
+    "room": (ROOM_COLUMNS, "rooms"),
+    "guest": (GUEST_COLUMNS, "guest_rows"),
+    "booking": (BOOKING_COLUMNS, "booking_rows"),
+}
+
+
+class LoadTestDataset(object):
+    '''
+    Reproducible synthetic dataset.
+
+    Ids are assigned densely starting at 1: hotels own the addresses 1..hotels, guests the addresses after
+    that. Bookings of a room never overlap, they are laid out one after another from the start of the horizon.
+    All iterators take a range [first, stop) of hotel or guest indexes, so the data can be produced in shards
+    starting at multiples of BLOCK_SIZE (bookings: at any hotel).
+    '''
+
+    def __init__(self, hotels: int, rooms_per_hotel: int, guests: int, bookings: int, seed: int = 1,
+                 start: date | None = None, horizon_days: int = 365):
+        if guests < 1 and bookings > 0:
+            raise ValueError("bookings need at least one guest")
+        self.hotels = hotels
+        self.rooms_per_hotel = rooms_per_hotel
+        self.guests = guests
+        self.bookings = bookings
+        self.seed = seed
+        self.start = start or date(date.today().year, 1, 1)
+        self.horizon_days = horizon_days
+
+    def __repr__(self) -> str:
+        return (f"LoadTestDataset(hotels={self.hotels!r}, rooms_per_hotel={self.rooms_per_hotel!r}, "
+                f"guests={self.guests!r}, bookings={self.bookings!r}, seed={self.seed!r})")
+
+    def tables(self) -> dict[str, tuple[tuple[str, ...], Iterator[tuple]]]:
+        # in insert order, every table only references tables before it
+        return {name: (columns, getattr(self, iterator)()) for name, (columns, iterator) in TABLES.items()}
+
+    def addresses(self, first: int = 0, stop: int | None = None) -> Iterator[tuple]:
+        stop = self.hotels + self.guests if stop is None else stop
+        for index, rng in self._random_blocks("address", self.seed, first, stop):
+            city, zip_code = rng.choice(CITIES)
+            yield index + 1, f"{rng.choice(STREETS)} {rng.randint(1, 200)}", zip_code, city
+
+    def hotel_rows(self, first: int = 0, stop: int | None = None) -> Iterator[tuple]:
+        stop = self.hotels if stop is None else stop
+        for index, rng in self._random_blocks("hotel", self.seed, first, stop):
+            yield index + 1, f"Hotel {rng.choice(HOTEL_NAMES)} {index + 1}", rng.randint(1, 5), index + 1
+
+    def rooms(self, first: int = 0, stop: int | None = None) -> Iterator[tuple]:
+        stop = self.hotels if stop is None else stop
+        for index, rng in self._random_blocks("room", self.seed, first, stop):
+            price_level = rng.uniform(0.8, 1.6)
+            for number in range(1, self.rooms_per_hotel + 1):
+                room_type, max_guests, description, price = rng.choice(ROOM_TYPES)
+                amenities = ", ".join(rng.sample(AMENITIES, rng.randint(1, 4)))
+                yield (index + 1, f"{number:03d}", room_type, max_guests, description, amenities,
+                       round(price * price_level, 0))
+
+    def guest_rows(self, first: int = 0, stop: int | None = None) -> Iterator[tuple]:
+        stop = self.guests if stop is None else stop
+        for index, rng in self._random_blocks("guest", self.seed, first, stop):
+            firstname, lastname = rng.choice(FIRSTNAMES), rng.choice(LASTNAMES)
+            email = f"{firstname}.{lastname}.{index + 1}@example.com".lower()
+            yield index + 1, firstname, lastname, email, self.hotels + index + 1, "guest"
+
+    def booking_rows(self, first: int = 0, stop: int | None = None) -> Iterator[tuple]:
+        '''
+        Bookings of the hotels in [first, stop). The requested number of bookings is spread evenly over all rooms.
+        '''
+        stop = self.hotels if stop is None else stop
+        number_of_rooms = self.hotels * self.rooms_per_hotel
+        if not number_of_rooms or not self.bookings:
+            return
+        per_room, remainder = divmod(self.bookings, number_of_rooms)
+        # average gap between two stays of a room, so that the bookings fill the horizon
+        mean_gap = max(0, self.horizon_days // max(1, per_room + 1) - 3)
+        # the rooms of a shard are generated from the start of their block on
+        skipped_rooms = first % BLOCK_SIZE * self.rooms_per_hotel
+        rooms = islice(self.rooms(first - first % BLOCK_SIZE, stop), skipped_rooms, None)
+        for index, rng in self._random_blocks("booking", self.seed, first, stop, block_size=1):
+            for room_index in range(self.rooms_per_hotel):
+                hotel_id, number, _, max_guests, _, _, _ = next(rooms)
+                count = per_room + (index * self.rooms_per_hotel + room_index < remainder)
+                day = self.start
+                for _ in range(count):
+                    day += timedelta(days=rng.randint(0, 2 * mean_gap))
+                    end = day + timedelta(days=rng.randint(1, 5))
+                    booked_on = day - timedelta(days=rng.randint(0, 120))
+                    yield hotel_id, number, rng.randint(1, self.guests), rng.randint(1, max_guests), day, end, booked_on
+                    day = end
+
+    def write_sqlite(self, engine: Engine, chunk_size: int = 50_000, verbose: bool = False,
+                     workers: int = 1) -> dict[str, BulkInsertResult]:
+        '''
+        Writes the dataset to an empty database. With workers > 1 the rows are generated in shards by a process
+        pool, each shard into an intermediate file, while this process inserts the finished shards in order.
+        '''
+        with engine.connect() as connection:
+            for table in (Address, Hotel, Guest, Booking):
+                if connection.scalar(select(func.count()).select_from(table)):
+                    raise ValueError(f"table {table.__tablename__} is not empty, "
+                                     "load test data has to be written to an empty database")
+        results = {}
+        with fulltext_sync_suspended(engine), occupancy_summary_suspended(engine):
+            if workers > 1:
+                with tempfile.TemporaryDirectory() as directory, ProcessPoolExecutor(workers) as pool:
+                    # all shards are submitted at once, so the workers keep generating while the writer inserts
+                    shards = {
+                        name: [pool.submit(_write_shard, self, name, first, stop,
+                                           Path(directory, f"{name}_{first}.pickle"))
+                               for first, stop in self._shard_bounds(name, workers * 4)]
+                        for name in TABLES
+                    }
+                    for name, futures in shards.items():
+                        rows = chain.from_iterable(_read_shard(future.result()) for future in futures)
+                        results[name] = bulk_insert_prepared(engine, Base.metadata.tables[name], rows,
+                                                             TABLES[name][0], chunk_size, verbose=verbose)
+            else:
+                for name, (columns, rows) in self.tables().items():
+                    table = Base.metadata.tables[name]
+                    results[name] = bulk_insert(engine, table, rows, columns, chunk_size, verbose=verbose)
+        migrate_amenities(engine)
+        return results
+
+    def write_csv(self, directory: str | os.PathLike) -> dict[str, Path]:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        files = {}
+        for name, (columns, rows) in self.tables().items():
+            files[name] = directory.joinpath(f"{name}.csv")
+            with open(files[name], "w", newline="", encoding="utf-8") as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(columns)
+                writer.writerows(rows)
+        return files
+
+    def write_parquet(self, directory: str | os.PathLike, chunk_size: int = 100_000) -> dict[str, Path]:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as err:
+            raise ImportError("writing Parquet files requires pyarrow (pip install pyarrow)") from err
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        files = {}
+        for name, (columns, rows) in self.tables().items():
+            files[name] = directory.joinpath(f"{name}.parquet")
+            writer = None
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                batch = pa.Table.from_pydict({column: list(values) for column, values in zip(columns, zip(*chunk))})
+                if writer is None:
+                    writer = pq.ParquetWriter(files[name], batch.schema)
+                writer.write_table(batch)
+            if writer is not None:
+                writer.close()
+        return files
+
+    def _shard_bounds(self, name: str, shards: int) -> List[tuple[int, int]]:
+        # about the given number of [first, stop) ranges, each starting at the beginning of a random block
+        total = {"address": self.hotels + self.guests, "guest": self.guests}.get(name, self.hotels)
+        block_size = 1 if name == "booking" else BLOCK_SIZE
+        per_shard = -(-total // max(1, shards))
+        size = max(1, -(-per_shard // block_size)) * block_size
+        return [(first, min(first + size, total)) for first in range(0, total, size)]
+
+    @staticmethod
+    def _random_blocks(kind: str, seed: int, first: int, stop: int,
+                       block_size: int = BLOCK_SIZE) -> Iterator[tuple[int, Random]]:
+        # yields every index in [first, stop) together with the random generator of its block
+        if first % block_size:
+            raise ValueError(f"shards have to start at a multiple of {block_size}")
+        for block_start in range(first, stop, block_size):
+            rng = Random(f"{seed}:{kind}:{block_start // block_size}")
+            for index in range(block_start, min(block_start + block_size, stop)):
+                yield index, rng
+
+
+def _write_shard(dataset: LoadTestDataset, name: str, first: int, stop: int, path: Path) -> Path:
+    # runs in a worker process, the rows are pickled in chunks so neither side holds a whole shard in memory;
+    # dates are converted here already, the writer passes the rows to the driver as they are
+    rows = getattr(dataset, TABLES[name][1])(first, stop)
+    with open(path, "wb") as shard_file:
+        while chunk := list(islice(rows, 10_000)):
+            if name == "booking":
+                chunk = [(*row[:4], row[4].isoformat(), row[5].isoformat(), row[6].isoformat()) for row in chunk]
+            pickle.dump(chunk, shard_file, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_shard(path: Path) -> Iterator[tuple]:
+    try:
+        with open(path, "rb") as shard_file:
+            while True:
+                try:
+                    yield from pickle.load(shard_file)
+                except EOFError:
+                    return
+    finally:
+        path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate synthetic hotel reservation data for load tests.")
+    parser.add_argument("--hotels", type=int, default=1000)
+    parser.add_argument("--rooms-per-hotel", type=int, default=20)
+    parser.add_argument("--guests", type=int, default=100_000)
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes generating the rows for --sqlite")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--sqlite", help="database file, existing data is removed")
+    output.add_argument("--csv", help="directory for one CSV file per table")
+    output.add_argument("--parquet", help="directory for one Parquet file per table")
+    args = parser.parse_args()
+
+    dataset = LoadTestDataset(args.hotels, args.rooms_per_hotel, args.guests, args.bookings, args.seed)
+    if args.sqlite:
+        init_db(args.sqlite, reset=True)
+        dataset.write_sqlite(get_engine(args.sqlite), verbose=True, workers=args.workers)
+    elif args.csv:
+        print(dataset.write_csv(args.csv))
+    else:
+        print(dataset.write_parquet(args.parquet))
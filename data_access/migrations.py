@@ -0,0 +1,88 @@
+# versioned schema migrations, the version of a database is stored in PRAGMA user_version
+# every step is idempotent, so databases created before the versioning (user_version 0) are upgraded as well
+from sqlalchemy import Connection, Engine, inspect
+
+from data_access.amenities import migrate_amenities
+from data_access.fulltext import create_fulltext_index, drop_fulltext_index
+from data_access.occupancy_summary import create_occupancy_summary, drop_occupancy_summary
+from data_access.table_versions import create_table_versions, drop_table_versions
+from data_models.models import *
+
+
+def _create_tables(connection: Connection):
+    # creates missing tables with their indexes, existing tables are left as they are
+    Base.metadata.create_all(connection)
+
+
+def _create_search_indexes(connection: Connection):
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_booking_room_dates "
+                               "ON booking (room_hotel_id, room_number, start_date, end_date)")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_address_city ON address (city)")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_hotel_address_id ON hotel (address_id)")
+
+
+def _normalise_amenities(connection: Connection):
+    if "amenity_mask" not in {column["name"] for column in inspect(connection).get_columns("room")}:
+        connection.exec_driver_sql("ALTER TABLE room ADD COLUMN amenity_mask INTEGER NOT NULL DEFAULT 0")
+    migrate_amenities(connection)
+
+
+def _add_booking_date(connection: Connection):
+    # bookings made before have no booking date and are left out of the lead time statistics
+    if "booked_on" not in {column["name"] for column in inspect(connection).get_columns("booking")}:
+        connection.exec_driver_sql("ALTER TABLE booking ADD COLUMN booked_on DATE")
+    create_table_versions(connection)
+
+
+# (version, description, step), a database with user_version n gets all steps with a higher version
+MIGRATIONS = [
+    (1, "create tables", _create_tables),
+    (2, "availability search indexes", _create_search_indexes),
+    (3, "normalised amenities", _normalise_amenities),
+    (4, "full text index", create_fulltext_index),
+    (5, "booking date and table versions", _add_booking_date),
+    (6, "hotel day occupancy summary", create_occupancy_summary),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(bind: Engine | Connection) -> int:
+    if isinstance(bind, Engine):
+        with bind.connect() as connection:
+            return schema_version(connection)
+    return bind.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def is_current(engine: Engine) -> bool:
+    return schema_version(engine) >= SCHEMA_VERSION
+
+
+def migrate(engine: Engine, verbose: bool = False) -> List[int]:
+    '''
+    Applies the missing migration steps, each in its own transaction together with the new version number.
+    The write lock is taken before the version is read, so concurrent starts apply every step only once.
+    '''
+    applied = []
+    for version, description, step in MIGRATIONS:
+        with engine.connect() as connection:
+            connection.execution_options(sqlite_immediate=True)
+            with connection.begin():
+                if schema_version(connection) >= version:
+                    continue
+                if verbose:
+                    print(f"Migrating database to version {version}: {description}")
+                step(connection)
+                connection.exec_driver_sql(f"PRAGMA user_version = {version}")
+        applied.append(version)
+    return applied
+
+
+def reset(engine: Engine):
+    # removes all tables, the next migrate() starts from an empty database
+    with engine.begin() as connection:
+        drop_fulltext_index(connection)
+        drop_table_versions(connection)
+        drop_occupancy_summary(connection)
+        Base.metadata.drop_all(connection)
+        connection.exec_driver_sql("PRAGMA user_version = 0")
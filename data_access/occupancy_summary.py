@@ -0,0 +1,197 @@
+# per hotel and day summary of the bookings: booked rooms, guests and revenue of the night starting on that day
+# kept in sync by triggers on booking (insert, update, cancel) and on room (price changes), so reports over a
+# period read one small row per hotel and day instead of expanding the date range of every booking.
+# Revenue is counted with the current room price, like the occupancy export and business.RevenueAnalytics.
+#
+# Triggers cannot use recursive CTEs, the nights of a booking are expanded by a join with day_number (0, 1, ...)
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import Connection, Date, Engine, Float, Integer, Select, cast, column, func, select, table
+
+from data_models.models import *
+
+hotel_day_occupancy = table("hotel_day_occupancy", column("hotel_id", Integer), column("day", Date),
+                            column("rooms_booked", Integer), column("guests", Integer), column("revenue", Float))
+
+# longest stay the triggers can expand, longer bookings are rejected
+MAX_NIGHTS = 3650
+
+_PRICE = "coalesce((SELECT price FROM room WHERE hotel_id = {b}.room_hotel_id AND number = {b}.room_number), 0)"
+
+_ADD_BOOKING = (
+    "INSERT INTO hotel_day_occupancy (hotel_id, day, rooms_booked, guests, revenue) "
+    "SELECT {b}.room_hotel_id, date({b}.start_date, '+' || n || ' days'), 1, {b}.number_of_guests, " + _PRICE + " "
+    "FROM day_number WHERE n < julianday({b}.end_date) - julianday({b}.start_date) "
+    "ON CONFLICT (hotel_id, day) DO UPDATE SET rooms_booked = rooms_booked + excluded.rooms_booked, "
+    "guests = guests + excluded.guests, revenue = revenue + excluded.revenue"
+)
+
+_REMOVE_BOOKING = (
+    "UPDATE hotel_day_occupancy SET rooms_booked = rooms_booked - 1, guests = guests - {b}.number_of_guests, "
+    "revenue = revenue - " + _PRICE + " "
+    "WHERE hotel_id = {b}.room_hotel_id AND day >= {b}.start_date AND day < {b}.end_date; "
+    "DELETE FROM hotel_day_occupancy "
+    "WHERE hotel_id = {b}.room_hotel_id AND day >= {b}.start_date AND day < {b}.end_date AND rooms_booked <= 0"
+)
+
+_CHECK_NIGHTS = (
+    f"SELECT RAISE(ABORT, 'stays longer than {MAX_NIGHTS} nights are not supported') "
+    f"WHERE julianday(NEW.end_date) - julianday(NEW.start_date) > {MAX_NIGHTS}"
+)
+
+OCCUPANCY_SUMMARY_DDL = [
+    "CREATE TABLE IF NOT EXISTS hotel_day_occupancy (hotel_id INTEGER NOT NULL, day DATE NOT NULL, "
+    "rooms_booked INTEGER NOT NULL, guests INTEGER NOT NULL, revenue FLOAT NOT NULL, "
+    "PRIMARY KEY (hotel_id, day)) WITHOUT ROWID",
+
+    "CREATE TABLE IF NOT EXISTS day_number (n INTEGER PRIMARY KEY) WITHOUT ROWID",
+
+    "WITH RECURSIVE numbers(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM numbers WHERE n + 1 < "
+    f"{MAX_NIGHTS}) INSERT OR IGNORE INTO day_number (n) SELECT n FROM numbers",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_day_occupancy_booking_insert AFTER INSERT ON booking BEGIN "
+    + _CHECK_NIGHTS + "; " + _ADD_BOOKING.format(b="NEW") + "; END",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_day_occupancy_booking_update "
+    "AFTER UPDATE OF room_hotel_id, room_number, number_of_guests, start_date, end_date ON booking BEGIN "
+    + _CHECK_NIGHTS + "; " + _REMOVE_BOOKING.format(b="OLD") + "; " + _ADD_BOOKING.format(b="NEW") + "; END",
+
+    "CREATE TRIGGER IF NOT EXISTS hotel_day_occupancy_booking_delete AFTER DELETE ON booking BEGIN "
+    + _REMOVE_BOOKING.format(b="OLD") + "; END",
+
+    # the revenue of every day with a booking of the room changes by the price difference
+    "CREATE TRIGGER IF NOT EXISTS hotel_day_occupancy_room_price AFTER UPDATE OF price ON room "
+    "WHEN NEW.price IS NOT OLD.price BEGIN "
+    "UPDATE hotel_day_occupancy SET revenue = revenue + (coalesce(NEW.price, 0) - coalesce(OLD.price, 0)) * "
+    "(SELECT count(*) FROM booking b WHERE b.room_hotel_id = OLD.hotel_id AND b.room_number = OLD.number "
+    "AND b.start_date <= hotel_day_occupancy.day AND b.end_date > hotel_day_occupancy.day) "
+    "WHERE hotel_id = OLD.hotel_id; END",
+]
+
+_NIGHT = "date(b.start_date, '+' || d.n || ' days')"
+
+_INSERT_ALL = (
+    "INSERT INTO hotel_day_occupancy (hotel_id, day, rooms_booked, guests, revenue) "
+    f"SELECT b.room_hotel_id, {_NIGHT}, count(*), sum(b.number_of_guests), sum(coalesce(r.price, 0)) "
+    "FROM booking b JOIN room r ON r.hotel_id = b.room_hotel_id AND r.number = b.room_number "
+    "JOIN day_number d ON d.n < julianday(b.end_date) - julianday(b.start_date)"
+)
+
+
+def create_occupancy_summary(bind: Engine | Connection):
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            return create_occupancy_summary(connection)
+    for statement in OCCUPANCY_SUMMARY_DDL:
+        bind.exec_driver_sql(statement)
+    rebuild_occupancy_summary(bind)
+
+
+def drop_occupancy_summary(connection: Connection):
+    # the triggers on booking and room are dropped with their tables or by occupancy_summary_suspended()
+    _drop_triggers(connection)
+    connection.exec_driver_sql("DROP TABLE IF EXISTS hotel_day_occupancy")
+    connection.exec_driver_sql("DROP TABLE IF EXISTS day_number")
+
+
+@contextmanager
+def occupancy_summary_suspended(engine: Engine):
+    # for bulk loads: one rebuild at the end is much faster than an upsert per booked night from the triggers
+    with engine.begin() as connection:
+        _drop_triggers(connection)
+    try:
+        yield
+    finally:
+        create_occupancy_summary(engine)
+
+
+def rebuild_occupancy_summary(connection: Connection, start: date | None = None, end: date | None = None) -> int:
+    '''
+    Recomputes the rows of the days in [start, end) (all days without start and end) from the bookings,
+    e.g. after bookings were changed with the triggers suspended. Returns the number of rows written.
+    '''
+    days, nights, bookings, parameters = [], [], [], []
+    if start is not None:
+        days.append("day >= ?")
+        nights.append(f"{_NIGHT} >= ?")
+        bookings.append("b.end_date > ?")
+        parameters.append(start.isoformat())
+    if end is not None:
+        days.append("day < ?")
+        nights.append(f"{_NIGHT} < ?")
+        bookings.append("b.start_date < ?")
+        parameters.append(end.isoformat())
+    connection.exec_driver_sql("DELETE FROM hotel_day_occupancy" + _where(days), tuple(parameters))
+    # the bookings overlapping the period and their nights inside it
+    query = f"{_INSERT_ALL}{_where(bookings + nights)} GROUP BY b.room_hotel_id, {_NIGHT}"
+    result = connection.exec_driver_sql(query, tuple(parameters * 2))
+    return result.rowcount
+
+
+def daily_occupancy_query(start: date, end: date, hotel_ids: List[int] | None = None) -> Select:
+    '''
+    One row per hotel and day of [start, end) with at least one booked room: rooms of the hotel, booked rooms,
+    occupancy, guests and revenue. Days without bookings have no row.
+    '''
+    summary = _summary_of_hotel(start, end)
+    rooms = _rooms_per_hotel()
+    query = (
+        select(summary.c.hotel_id, summary.c.day, rooms.c.rooms, summary.c.rooms_booked,
+               cast(summary.c.rooms_booked * 1.0 / rooms.c.rooms, Float).label("occupancy"), summary.c.guests,
+               summary.c.revenue)
+        .select_from(Hotel)
+        .join(summary, summary.c.hotel_id == Hotel.id)
+        .join(rooms, rooms.c.hotel_id == Hotel.id)
+        .order_by(summary.c.hotel_id, summary.c.day)
+    )
+    if hotel_ids is not None:
+        query = query.where(Hotel.id.in_(hotel_ids))
+    return query
+
+
+def hotel_occupancy_query(start: date, end: date) -> Select:
+    '''
+    One row per hotel: rooms, room nights in [start, end), booked room nights, occupancy, guest nights and revenue.
+    '''
+    summary = _summary_of_hotel(start, end)
+    booked = (
+        select(Hotel.id.label("hotel_id"), func.coalesce(func.sum(summary.c.rooms_booked), 0).label("booked_nights"),
+               func.coalesce(func.sum(summary.c.guests), 0).label("guest_nights"),
+               func.coalesce(func.sum(summary.c.revenue), 0.0).label("revenue"))
+        .outerjoin(summary, summary.c.hotel_id == Hotel.id)
+        .group_by(Hotel.id)
+        .subquery()
+    )
+    rooms = _rooms_per_hotel()
+    room_nights = func.coalesce(rooms.c.rooms, 0) * (end - start).days
+    return (
+        select(booked.c.hotel_id, func.coalesce(rooms.c.rooms, 0).label("rooms"), room_nights.label("room_nights"),
+               booked.c.booked_nights,
+               cast(func.coalesce(booked.c.booked_nights * 1.0 / func.nullif(room_nights, 0), 0.0), Float)
+               .label("occupancy"),
+               booked.c.guest_nights, cast(booked.c.revenue, Float).label("revenue"))
+        .outerjoin(rooms, rooms.c.hotel_id == booked.c.hotel_id)
+        .order_by(booked.c.hotel_id)
+    )
+
+
+def _summary_of_hotel(start: date, end: date):
+    # the days of the period are a range of the primary key (hotel_id, day) of every hotel; driven by the hotel
+    # table the rows are read with one index seek per hotel instead of a scan over all days of all hotels
+    summary = hotel_day_occupancy.alias("summary")
+    return select(summary).where(summary.c.day >= start).where(summary.c.day < end).subquery("summary")
+
+
+def _rooms_per_hotel():
+    return select(Room.hotel_id, func.count().label("rooms")).group_by(Room.hotel_id).subquery()
+
+
+def _where(conditions: List[str]) -> str:
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def _drop_triggers(connection: Connection):
+    for (trigger,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'hotel_day_occupancy_%'").all():
+        connection.exec_driver_sql(f"DROP TRIGGER {trigger}")
@@ -0,0 +1,161 @@
+# read-only projections of listings and search results, built straight from the rows of Core selects
+# an ORM object carries instance state, an identity map entry and relationship loaders; the slotted, frozen
+# dataclasses here only hold their values. Repeated values (cities, room types, dates, ...) are interned and the
+# hotel and address of many rooms are one shared instance: about 200 bytes per booking or room instead of 1.2 KB.
+#
+# The classes have the attribute names of the models, code that only reads (e.g. the JSON serializers of the HTTP
+# service) works with both. Nothing is lazy loaded: what is not selected is not there.
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Iterator
+
+from sqlalchemy import Connection, Select, select
+from sqlalchemy.orm import Session
+
+from data_models.models import *
+
+ADDRESS_COLUMNS = (Address.id, Address.street, Address.zip, Address.city)
+HOTEL_COLUMNS = (Hotel.id, Hotel.name, Hotel.stars) + ADDRESS_COLUMNS
+ROOM_COLUMNS = (Room.hotel_id, Room.number, Room.type, Room.max_guests, Room.description, Room.amenities,
+                Room.price, Hotel.name, Hotel.stars) + ADDRESS_COLUMNS
+BOOKING_COLUMNS = (Booking.id, Booking.room_hotel_id, Booking.room_number, Booking.guest_id, Booking.number_of_guests,
+                   Booking.start_date, Booking.end_date, Booking.comment)
+
+
+@dataclass(frozen=True, slots=True, repr=False)
+class AddressView:
+    id: int
+    street: str
+    zip: str
+    city: str
+
+    def __repr__(self) -> str:
+        return f"Address(id={self.id!r}, street={self.street!r}, city={self.city!r}, zip={self.zip!r})"
+
+
+@dataclass(frozen=True, slots=True, repr=False)
+class HotelView:
+    id: int
+    name: str
+    stars: int
+    address: AddressView
+
+    def __repr__(self) -> str:
+        return f"Hotel(id={self.id!r}, name={self.name!r}, stars={self.stars}, address={self.address})"
+
+
+@dataclass(frozen=True, slots=True, repr=False)
+class RoomView:
+    hotel_id: int
+    number: str
+    type: str | None
+    max_guests: int
+    description: str | None
+    amenities: str | None
+    price: float
+    hotel: HotelView
+
+    def __repr__(self) -> str:
+        return (f"Room(hotel={self.hotel}, room_number={self.number!r}, type={self.type!r}, "
+                f"description={self.description!r}, amenities={self.amenities!r}, price={self.price!r})")
+
+
+@dataclass(frozen=True, slots=True)
+class BookingView:
+    id: int
+    room_hotel_id: int
+    room_number: str
+    guest_id: int
+    number_of_guests: int
+    start_date: date
+    end_date: date
+    comment: str | None
+
+
+class Projector(object):
+    '''
+    Turns rows into views. Equal values and the hotels and addresses with the same id are shared between all rows
+    projected by one projector, so a projector should live as long as the results it produced, not longer.
+    '''
+
+    def __init__(self):
+        self._values: dict = {}
+        self._addresses: dict[int, AddressView] = {}
+        self._hotels: dict[int, HotelView] = {}
+
+    def intern(self, value):
+        return value if value is None else self._values.setdefault(value, value)
+
+    def address(self, address_id: int, street: str, zip_code: str, city: str) -> AddressView:
+        address = self._addresses.get(address_id)
+        if address is None:
+            intern = self.intern
+            address = self._addresses[address_id] = AddressView(address_id, street, intern(zip_code), intern(city))
+        return address
+
+    def hotel(self, hotel_id: int, name: str, stars: int, *address: object) -> HotelView:
+        hotel = self._hotels.get(hotel_id)
+        if hotel is None:
+            hotel = self._hotels[hotel_id] = HotelView(hotel_id, name, stars, self.address(*address))
+        return hotel
+
+    def hotels(self, rows: Iterable[tuple]) -> List[HotelView]:
+        # rows of HOTEL_COLUMNS
+        return [self.hotel(*row) for row in rows]
+
+    def rooms(self, rows: Iterable[tuple]) -> List[RoomView]:
+        # rows of ROOM_COLUMNS
+        intern, hotel = self.intern, self.hotel
+        return [RoomView(hotel_id, intern(number), intern(room_type), max_guests, intern(description),
+                         intern(amenities), price, hotel(hotel_id, *hotel_columns))
+                for hotel_id, number, room_type, max_guests, description, amenities, price, *hotel_columns in rows]
+
+    def bookings(self, rows: Iterable[tuple]) -> Iterator[BookingView]:
+        # rows of BOOKING_COLUMNS
+        intern = self.intern
+        for booking_id, hotel_id, room_number, guest_id, guests, start_date, end_date, comment in rows:
+            yield BookingView(booking_id, hotel_id, intern(room_number), guest_id, guests, intern(start_date),
+                              intern(end_date), comment)
+
+
+def hotels_query() -> Select:
+    return select(*HOTEL_COLUMNS).join(Hotel.address).order_by(Hotel.id)
+
+
+def rooms_query(query: Select | None = None) -> Select:
+    # the columns of ROOM_COLUMNS for a select of Room joined with hotel and address, e.g. available_rooms_query()
+    if query is None:
+        query = select(Room).join(Room.hotel).join(Hotel.address).order_by(Room.hotel_id, Room.number)
+    return query.with_only_columns(*ROOM_COLUMNS, maintain_column_froms=False)
+
+
+def bookings_query(start: date | None = None, end: date | None = None) -> Select:
+    # with start/end only the bookings overlapping [start, end)
+    query = select(*BOOKING_COLUMNS).order_by(Booking.id)
+    if start is not None:
+        query = query.where(Booking.end_date > start)
+    if end is not None:
+        query = query.where(Booking.start_date < end)
+    return query
+
+
+def load_hotels(session: Session | Connection, projector: Projector | None = None) -> List[HotelView]:
+    return (projector or Projector()).hotels(session.execute(hotels_query()))
+
+
+def load_rooms(session: Session | Connection, query: Select | None = None,
+               projector: Projector | None = None) -> List[RoomView]:
+    return (projector or Projector()).rooms(session.execute(rooms_query(query)))
+
+
+def iter_bookings(connection: Connection, start: date | None = None, end: date | None = None,
+                  batch_size: int = 10_000, projector: Projector | None = None) -> Iterator[BookingView]:
+    '''
+    Streams the bookings from a server side cursor, only one batch of rows is buffered at a time.
+    '''
+    rows = connection.execution_options(yield_per=batch_size).execute(bookings_query(start, end))
+    yield from (projector or Projector()).bookings(rows)
+
+
+def load_bookings(connection: Connection, start: date | None = None, end: date | None = None) -> List[BookingView]:
+    return list(iter_bookings(connection, start, end))
@@ -0,0 +1,304 @@
+# query instrumentation on the cursor events of an engine: latency histogram, rows and N+1 detection per
+# statement and entry point, exposed in the Prometheus text format and as a report at exit
+#
+# enable it for every engine of get_engine() with the environment variable QUERY_STATS=1 (report on stderr at
+# exit) or QUERY_STATS=<file> (report written to the file), or call instrument(engine) directly
+# latencies are the time spent in cursor.execute, which for SQLite includes stepping to the first row; rows are
+# counted while the application fetches them. The overhead is a few microseconds per statement.
+import atexit
+import contextvars
+import hashlib
+import sys
+import threading
+import time
+import weakref
+from contextlib import ContextDecorator
+
+from sqlalchemy import Engine, event
+
+# upper bounds in seconds, like the Prometheus client defaults but finer below one millisecond
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# a SELECT executed this often within one unit of work is reported as N+1 pattern
+N_PLUS_ONE_THRESHOLD = 10
+# further distinct statements are counted as one "other" statement
+MAX_STATEMENTS = 2000
+OTHER_STATEMENT = "(other statements)"
+NO_ENTRY_POINT = "(none)"
+
+
+class _UnitOfWork(object):
+    __slots__ = ("name", "executions")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.executions: dict[str, int] = {}
+
+
+_unit_of_work: contextvars.ContextVar[_UnitOfWork | None] = contextvars.ContextVar("unit_of_work", default=None)
+
+
+class entry_point(ContextDecorator):
+    '''
+    Tags the statements executed inside with the name of the entry point, as decorator or with-statement.
+    Everything inside is one unit of work for the N+1 detection; nested entry points belong to the outer one.
+    '''
+
+    def __init__(self, name: str):
+        self.name = name
+        self._token = None
+
+    def _recreate_cm(self):
+        # a decorated function can run in several threads at once
+        return entry_point(self.name)
+
+    def __enter__(self):
+        if _unit_of_work.get() is None:
+            self._token = _unit_of_work.set(_UnitOfWork(self.name))
+        return self
+
+    def __exit__(self, *exc):
+        if self._token is not None:
+            _unit_of_work.reset(self._token)
+        return False
+
+
+class StatementStats(object):
+    __slots__ = ("entry_point", "statement", "count", "seconds", "buckets", "rows", "n_plus_one", "max_repeats")
+
+    def __init__(self, entry_point: str, statement: str):
+        self.entry_point = entry_point
+        self.statement = statement
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.rows = 0
+        self.n_plus_one = 0
+        self.max_repeats = 0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        # upper bound of the bucket holding the q-quantile
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    @property
+    def statement_id(self) -> str:
+        return hashlib.sha1(self.statement.encode()).hexdigest()[:10]
+
+
+class QueryStats(object):
+    def __init__(self, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._statements: dict[tuple[str, str], StatementStats] = {}
+        self._lock = threading.Lock()
+        self._report_registered = False
+
+    def record(self, statement: str, seconds: float, rows: int, executemany: bool, connection_info: dict):
+        unit = _unit_of_work.get()
+        name = unit.name if unit is not None else NO_ENTRY_POINT
+        if unit is not None:
+            executions = unit.executions
+        else:
+            # without an entry point the unit of work is the transaction of the connection
+            executions = connection_info.setdefault("query_stats_executions", {})
+        repeats = 0
+        if not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            repeats = executions[statement] = executions.get(statement, 0) + 1
+        with self._lock:
+            stats = self._stats(name, statement)
+            stats.observe(seconds)
+            stats.rows += max(rows, 0)
+            if repeats == self.n_plus_one_threshold:
+                stats.n_plus_one += 1
+            stats.max_repeats = max(stats.max_repeats, repeats)
+        return stats
+
+    def add_rows(self, stats: StatementStats, rows: int):
+        with self._lock:
+            stats.rows += rows
+
+    def statements(self) -> list[StatementStats]:
+        with self._lock:
+            return sorted(self._statements.values(), key=lambda stats: stats.seconds, reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP db_query_duration_seconds Duration of SQL statements by entry point.",
+            "# TYPE db_query_duration_seconds histogram",
+        ]
+        statements = self.statements()
+        for stats in statements:
+            labels = _labels(stats)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'db_query_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'db_query_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f"db_query_duration_seconds_sum{{{labels}}} {stats.seconds}")
+            lines.append(f"db_query_duration_seconds_count{{{labels}}} {stats.count}")
+        lines += ["# HELP db_query_rows_total Rows returned or changed by SQL statements.",
+                  "# TYPE db_query_rows_total counter"]
+        lines += [f"db_query_rows_total{{{_labels(stats)}}} {stats.rows}" for stats in statements]
+        lines += ["# HELP db_query_n_plus_one_total Units of work repeating a SELECT at least "
+                  f"{self.n_plus_one_threshold} times.",
+                  "# TYPE db_query_n_plus_one_total counter"]
+        lines += [f"db_query_n_plus_one_total{{{_labels(stats)}}} {stats.n_plus_one}"
+                  for stats in statements if stats.n_plus_one]
+        return "\n".join(lines) + "\n"
+
+    def report(self, limit: int = 25) -> str:
+        statements = self.statements()
+        total = sum(stats.seconds for stats in statements)
+        lines = [f"Query statistics: {sum(stats.count for stats in statements)} statements, {total:.3f}s",
+                 f"{'seconds':>9} {'count':>8} {'mean ms':>8} {'p95 ms':>8} {'rows':>9} {'N+1':>5}  "
+                 f"entry point / statement"]
+        for stats in statements[:limit]:
+            n_plus_one = f"{stats.n_plus_one}" if stats.n_plus_one else ""
+            lines.append(f"{stats.seconds:9.3f} {stats.count:8} {stats.seconds / stats.count * 1000:8.2f} "
+                         f"{stats.quantile(0.95) * 1000:8.2f} {stats.rows:9} {n_plus_one:>5}  "
+                         f"{stats.entry_point} [{stats.statement_id}]")
+            lines.append(f"{'':>52}{_short(stats.statement, 160)}")
+        flagged = [stats for stats in statements if stats.n_plus_one]
+        if flagged:
+            lines.append("N+1 patterns (same SELECT repeated within one unit of work):")
+            lines += [f"  {stats.entry_point}: up to {stats.max_repeats} times [{stats.statement_id}] "
+                      f"{_short(stats.statement, 100)}" for stats in flagged]
+        return "\n".join(lines) + "\n"
+
+    def dump_report(self, path: str | None = None):
+        if path is None:
+            sys.stderr.write(self.report())
+        else:
+            with open(path, "w", encoding="utf-8") as report_file:
+                report_file.write(self.report())
+                report_file.write("\n")
+                report_file.write(self.prometheus())
+
+    def report_at_exit(self, path: str | None = None):
+        if not self._report_registered:
+            self._report_registered = True
+            atexit.register(self.dump_report, path)
+
+    def _stats(self, name: str, statement: str) -> StatementStats:
+        stats = self._statements.get((name, statement))
+        if stats is None:
+            if len(self._statements) >= MAX_STATEMENTS:
+                statement = OTHER_STATEMENT
+                stats = self._statements.get((name, statement))
+            if stats is None:
+                stats = self._statements[(name, statement)] = StatementStats(name, statement)
+        return stats
+
+
+# shared by all instrumented engines of a process
+query_stats = QueryStats()
+
+_instrumented: weakref.WeakSet = weakref.WeakSet()
+
+
+def instrument(engine: Engine, stats: QueryStats = query_stats) -> Engine:
+    '''
+    Installs the cursor event listeners. Rows of SELECT statements are counted while they are fetched, by a
+    row factory on the DBAPI connections; pooled connections are replaced so that all of them get it.
+    '''
+    if engine in _instrumented:
+        return engine
+    _instrumented.add(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        _flush_rows(connection.info, stats)
+        context._query_stats_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - context._query_stats_started
+        counter = connection.info.get("query_stats_rows")
+        if cursor.description is None:
+            rows = cursor.rowcount
+        elif counter is None:
+            # the cursors of the asyncio adapters have fetched the whole result already
+            rows = len(getattr(cursor, "_rows", ()))
+        else:
+            rows = 0
+        statement_stats = stats.record(statement, seconds, rows, executemany, connection.info)
+        if counter is not None and cursor.description is not None:
+            counter.track(cursor, statement_stats)
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.info.pop("query_stats_executions", None)
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        if hasattr(dbapi_connection, "row_factory"):
+            counter = connection_record.info["query_stats_rows"] = _RowCounter()
+            dbapi_connection.row_factory = counter.row_factory
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        if connection_record is not None:
+            _flush_rows(connection_record.info, stats)
+
+    engine.dispose()
+    return engine
+
+
+class _RowCounter(object):
+    # rows fetched per cursor of one DBAPI connection, which is only used by one thread at a time
+    __slots__ = ("statements", "rows")
+
+    def __init__(self):
+        self.statements: dict[int, StatementStats] = {}
+        self.rows: dict[int, int] = {}
+
+    def track(self, cursor, stats: StatementStats):
+        self.statements[id(cursor)] = stats
+        self.rows[id(cursor)] = 0
+
+    def row_factory(self, cursor, row):
+        key = id(cursor)
+        if key in self.rows:
+            self.rows[key] += 1
+        return row
+
+
+def _flush_rows(connection_info: dict, stats: QueryStats):
+    # rows fetched since the last statement of the connection, or since it was checked out
+    counter = connection_info.get("query_stats_rows")
+    if counter is not None and counter.rows:
+        for key, rows in counter.rows.items():
+            stats.add_rows(counter.statements[key], rows)
+        counter.rows.clear()
+        counter.statements.clear()
+
+
+def _labels(stats: StatementStats) -> str:
+    return (f'entry_point="{_escape(stats.entry_point)}",statement_id="{stats.statement_id}",'
+            f'statement="{_escape(_short(stats.statement, 120))}"')
+
+
+def _short(statement: str, length: int) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= length else statement[:length - 3] + "..."
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
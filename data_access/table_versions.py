@@ -0,0 +1,34 @@
+# change counters of tables, incremented by triggers on every insert, update and delete
+# caches of data derived from a table (e.g. business.RevenueAnalytics) compare the counter with the one they were
+# computed at, which costs one primary key lookup instead of a scan; changes of other processes are seen as well
+from sqlalchemy import Connection, Engine
+
+VERSIONED_TABLES = ("booking", "room")
+
+_TRIGGER = ("CREATE TRIGGER IF NOT EXISTS table_version_{table}_{event} AFTER {event} ON {table} BEGIN "
+            "UPDATE table_version SET version = version + 1 WHERE name = '{table}'; END")
+
+
+def create_table_versions(bind: Engine | Connection):
+    if isinstance(bind, Engine):
+        with bind.begin() as connection:
+            return create_table_versions(connection)
+    bind.exec_driver_sql("CREATE TABLE IF NOT EXISTS table_version "
+                         "(name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID")
+    for table in VERSIONED_TABLES:
+        bind.exec_driver_sql("INSERT OR IGNORE INTO table_version (name) VALUES (?)", (table,))
+        for event in ("insert", "update", "delete"):
+            bind.exec_driver_sql(_TRIGGER.format(table=table, event=event))
+
+
+def drop_table_versions(connection: Connection):
+    # the triggers are defined on the versioned tables, they would write to the dropped table
+    for (trigger,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'table_version_%'").all():
+        connection.exec_driver_sql(f"DROP TRIGGER {trigger}")
+    connection.exec_driver_sql("DROP TABLE IF EXISTS table_version")
+
+
+def table_versions(connection: Connection, tables=VERSIONED_TABLES) -> tuple[int, ...]:
+    versions = dict(connection.exec_driver_sql("SELECT name, version FROM table_version").all())
+    return tuple(versions.get(table, 0) for table in tables)
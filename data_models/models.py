@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import date
 
 from typing import List
-from sqlalchemy import ForeignKey, ForeignKeyConstraint
+from sqlalchemy import Column, ForeignKey, ForeignKeyConstraint, Index, Table
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
@@ -27,7 +27,7 @@ class Address(Base):
     id: Mapped[int] = mapped_column("id", primary_key=True)
     street: Mapped[str] = mapped_column("street")
     zip: Mapped[str] = mapped_column("zip")
-    city: Mapped[str] = mapped_column("city")
+    city: Mapped[str] = mapped_column("city", index=True)
 
     def __repr__(self) -> str:
         return f"Address(id={self.id!r}, street={self.street!r}, city={self.city!r}, zip={self.zip!r})"
@@ -108,7 +108,7 @@ class Hotel(Base):
     id: Mapped[int] = mapped_column("id", primary_key=True)
     name: Mapped[str] = mapped_column("name")
     stars: Mapped[int] = mapped_column("stars", default=0)
-    address_id: Mapped[int] = mapped_column("address_id", ForeignKey("address.id"))
+    address_id: Mapped[int] = mapped_column("address_id", ForeignKey("address.id"), index=True)
     address: Mapped["Address"] = relationship()
     rooms: Mapped[List["Room"]] = relationship(back_populates="hotel")
 
@@ -116,6 +116,32 @@ class Hotel(Base):
         return f"Hotel(id={self.id!r}, name={self.name!r}, stars={self.stars}, address={self.address})"
 
 
+class Amenity(Base):
+    '''
+    Ausstattungs Entitätstyp. Ausstattungen mit bit (0..62) sind zusätzlich in Room.amenity_mask kodiert.
+    '''
+    __tablename__ = "amenity"
+
+    id: Mapped[int] = mapped_column("id", primary_key=True)
+    name: Mapped[str] = mapped_column("name", unique=True)
+    bit: Mapped[int] = mapped_column("bit", unique=True, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"Amenity(id={self.id!r}, name={self.name!r}, bit={self.bit!r})"
+
+
+room_amenity = Table(
+    "room_amenity",
+    Base.metadata,
+    Column("room_hotel_id", primary_key=True),
+    Column("room_number", primary_key=True),
+    Column("amenity_id", ForeignKey("amenity.id"), primary_key=True),
+    ForeignKeyConstraint(["room_hotel_id", "room_number"], ["room.hotel_id", "room.number"]),
+    # "welche Zimmer haben Ausstattung X" ohne Scan der Zuordnungstabelle
+    Index("ix_room_amenity_amenity", "amenity_id", "room_hotel_id", "room_number"),
+)
+
+
 class Room(Base):
     '''
     Raum Entitätstyp.
@@ -128,7 +154,9 @@ class Room(Base):
     type: Mapped[str] = mapped_column("type", nullable=True) # e.g. "family room", "single room", etc.
     max_guests: Mapped[int] = mapped_column("max_guests")
     description: Mapped[str] = mapped_column("description", nullable=True) # e.g. "Room with sea view"
-    amenities: Mapped[str] = mapped_column("amenities", nullable=True)
+    amenities: Mapped[str] = mapped_column("amenities", nullable=True) # e.g. "TV, Caffe Machine"
+    amenity_list: Mapped[List["Amenity"]] = relationship(secondary=room_amenity)
+    amenity_mask: Mapped[int] = mapped_column("amenity_mask", default=0, server_default="0")
     price: Mapped[float] = mapped_column("price")
 
     def __repr__(self) -> str:
@@ -151,12 +179,16 @@ class Booking(Base):
     start_date: Mapped[date] = mapped_column("start_date")
     end_date: Mapped[date] = mapped_column("end_date")
     comment: Mapped[str] = mapped_column("comment", nullable=True)
+    # Buchungsdatum, für die Vorlaufzeit (lead time) der Auswertungen; fehlt bei Buchungen vor Version 5 des Schemas
+    booked_on: Mapped[date] = mapped_column("booked_on", nullable=True, default=date.today)
 
     __table_args__ = (
         ForeignKeyConstraint(
             ['room_hotel_id', 'room_number'],
             ['room.hotel_id', 'room.number'],
         ),
+        # deckt die Überschneidungsprüfung der Verfügbarkeitssuche ab (siehe SearchManager)
+        Index("ix_booking_room_dates", "room_hotel_id", "room_number", "start_date", "end_date"),
     )
 
     def __repr__(self) -> str:
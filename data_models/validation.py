@@ -0,0 +1,37 @@
+# validation rules for hotel and address input, shared by the GUI validators (QRegularExpression) and the importer
+import re
+
+HOTEL_NAME_PATTERN = r'^[a-zA-Z0-9 ]{4,}$'
+STREET_PATTERN = r'^[a-zA-Z0-9 \\.\\-]{5,}$'
+ZIP_PATTERN = r'^[0-9]{4}$'
+CITY_PATTERN = r'^[a-zA-Z]{4,}$'
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
+STARS = range(1, 6)
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def check_pattern(value, pattern: str, field: str) -> str:
+    value = "" if value is None else str(value).strip()
+    if not re.fullmatch(pattern, value):
+        raise ValidationError(f"{field} {value!r} does not match {pattern}")
+    return value
+
+
+def check_number(value, field: str, minimum: float = 0, number_type: type = int):
+    try:
+        number = number_type(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"{field} {value!r} is not a number")
+    if number < minimum:
+        raise ValidationError(f"{field} must be at least {minimum}")
+    return number
+
+
+def check_required(value, field: str) -> str:
+    value = "" if value is None else str(value).strip()
+    if not value:
+        raise ValidationError(f"{field} is required")
+    return value
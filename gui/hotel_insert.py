@@ -1,12 +1,15 @@
 import sys
 
 from PyQt5 import QtCore, QtGui
-from PyQt5 import uic
 from PyQt5.QtWidgets import QLineEdit, QComboBox, QPushButton, QMainWindow, QApplication, QMessageBox
-from sqlalchemy import create_engine, exc
+from sqlalchemy import exc
 from sqlalchemy.orm import Session
 
+from data_access.catalogue_cache import catalogue_cache
+from data_access.engine_factory import get_engine
 from data_models.models import *
+from data_models.validation import CITY_PATTERN, HOTEL_NAME_PATTERN, STREET_PATTERN, ZIP_PATTERN
+from gui.ui_loader import load_ui
 
 
 class NameAddressValidator(QtGui.QRegularExpressionValidator):
@@ -21,7 +24,7 @@ class NameAddressValidator(QtGui.QRegularExpressionValidator):
 class HotelUIForm(QMainWindow):
     def __init__(self):
         super().__init__()
-        uic.loadUi("./gui/hotel_creation.ui", self)
+        load_ui("./gui/hotel_creation.ui", self)
 
         # GUI controls
         self.lineEdit_name: QLineEdit = self.lineEdit_name
@@ -52,28 +55,28 @@ class HotelUIForm(QMainWindow):
         # Validators für Hotelname / Adresse (mit QValidator)
         # Validierung für Hotelname
         global name_validator
-        name_regexp = QtCore.QRegularExpression(r'^[a-zA-Z0-9 ]{4,}$')
+        name_regexp = QtCore.QRegularExpression(HOTEL_NAME_PATTERN)
         name_validator = NameAddressValidator(name_regexp, self)
         name_validator.validationChanged.connect(self.handle_validation_change_name)
         self.lineEdit_name.setValidator(name_validator)
 
         # Validierung für Strasse
         global strasse_validator
-        strasse_regexp = QtCore.QRegularExpression(r'^[a-zA-Z0-9 \\.\\-]{5,}$')
+        strasse_regexp = QtCore.QRegularExpression(STREET_PATTERN)
         strasse_validator = NameAddressValidator(strasse_regexp, self)
         strasse_validator.validationChanged.connect(self.handle_validation_change_strasse)
         self.lineEdit_strasse.setValidator(strasse_validator)
 
         # Validierung für PLZ
         global plz_validator
-        plz_regexp = QtCore.QRegularExpression(r'^[0-9]{4}$')
+        plz_regexp = QtCore.QRegularExpression(ZIP_PATTERN)
         plz_validator = NameAddressValidator(plz_regexp, self)
         plz_validator.validationChanged.connect(self.handle_validation_change_plz)
         self.lineEdit_plz.setValidator(plz_validator)
 
         # Validierung für Ort
         global ort_validator
-        ort_regexp = QtCore.QRegularExpression(r'^[a-zA-Z]{4,}$')
+        ort_regexp = QtCore.QRegularExpression(CITY_PATTERN)
         ort_validator = NameAddressValidator(ort_regexp, self)
         ort_validator.validationChanged.connect(self.handle_validation_change_ort)
         self.lineEdit_ort.setValidator(ort_validator)
@@ -86,12 +89,7 @@ class HotelUIForm(QMainWindow):
         result_ort, _, _ = ort_validator.validate(self.lineEdit_ort.text(), 0)
 
         if result_name and result_strasse and result_plz and result_ort == QtGui.QValidator.Acceptable == QtGui.QValidator.Acceptable:
-            engine = create_engine("sqlite:///data/example.db", echo=True)
-            try:
-                engine.connect()
-                print("Connection successful")
-            except SQLAlchemyError as err:
-                print("Connection not successful", err.__cause__)
+            engine = get_engine("data/example.db")
 
             hotel_name = self.lineEdit_name.text()
             hotel_sterne = int(self.comboBox_sterne.currentText())
@@ -107,6 +105,7 @@ class HotelUIForm(QMainWindow):
                                                   city=adresse_ort))
                     session.add(hotel)
                     session.commit()
+                    catalogue_cache.invalidate()
 
                 except exc.SQLAlchemyError:
                     QMessageBox.question(self, "Message",
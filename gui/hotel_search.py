@@ -1,80 +1,89 @@
-from PyQt5 import uic
 from PyQt5.QtWidgets import QMainWindow, QLineEdit, QPushButton, QTableView, QHeaderView
-from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtCore import QThreadPool, QTimer
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from gui.ui_loader import load_ui
 
-from data_models.models import *
+# the table model, its search worker and with them SQLAlchemy and the models (gui.hotel_table_model) are imported
+# by open(), so a window created without a session_maker is shown before the database layer is loaded
 
 
 class HotelTableView(QMainWindow):
-    def __init__(self, session, *args):
+    def __init__(self, session_maker, *args, debounce_ms: int = 250):
         QMainWindow.__init__(self, *args)
-        uic.loadUi("./gui/hotel_search.ui", self)
+        load_ui("./gui/hotel_search.ui", self)
         self.txt_name: QLineEdit = self.txt_name
         self.btn_search: QPushButton = self.btn_search
         self.hotelTableView: QTableView = self.hotelTableView
-        self.session = session
+        # without a session_maker the window stays empty until open() is called, e.g. after it has been shown
+        self.session_maker = None
+        self.session = None
+        self.hotelTableModel = None
+
+        self._thread_pool = QThreadPool.globalInstance()
+        self._search_generation = 0
+        self._search_worker = None
+        # search as you type, the search starts once typing pauses for debounce_ms
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(debounce_ms)
+        self._search_timer.timeout.connect(self.start_search)
+
+        self.btn_search.clicked.connect(self.btn_search_clicked)
+        self.txt_name.textChanged.connect(self._search_timer.start)
+        if session_maker is not None:
+            # the first search starts once the event loop runs, so the window is painted before it
+            QTimer.singleShot(0, lambda: self.open(session_maker))
+
+    def open(self, session_maker):
+        from gui.hotel_table_model import HotelTableModel
+
+        # the model fetches further pages on the GUI thread while scrolling, searches run in the thread pool
+        self.session_maker = session_maker
+        self.session = session_maker()
         self.hotelTableModel = HotelTableModel(self, self.session)
-        self.hotelTableModel.all()
         self.hotelTableView.setModel(self.hotelTableModel)
-
         self.hotelTableView.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
         self.hotelTableView.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
         self.hotelTableView.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
         self.hotelTableView.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
-
-        self.btn_search.clicked.connect(self.btn_search_clicked)
+        self.start_search()
 
     def btn_search_clicked(self):
-        self.hotelTableModel.search_name(self.txt_name.text())
-        self.hotelTableView.viewport().update()
-
-
-class HotelTableModel(QAbstractTableModel):
-    id = "Id"
-    name = "Name"
-    number_of_rooms = "# of rooms"
-    address = "Address"
-
-    def __init__(self, parent, session: Session, *args) -> None:
-        QAbstractTableModel.__init__(self, parent, *args)
-        self.header = [
-            HotelTableModel.id,
-            HotelTableModel.name,
-            HotelTableModel.number_of_rooms,
-            HotelTableModel.address
-        ]
-        self.session = session
-        self.hotels: List[Hotel] = []
-
-    def all(self):
-        self.hotels = self.session.query(Hotel).all()
-
-    def search_name(self, like: str):
-        like = like.lower()
-        self.hotels = self.session.query(Hotel).filter(func.lower(Hotel.name).like(f'%{like}%')).all()
-
-    def rowCount(self, parent: QModelIndex = ...) -> int:
-        return len(self.hotels)
-
-    def columnCount(self, parent: QModelIndex = ...) -> int:
-        return len(self.header)
-
-    def data(self, index: QModelIndex, role: int = ...):
-        if not index.isValid():
-            return None
-        if role == Qt.DisplayRole:
-            if self.header[index.column()] == HotelTableModel.id:
-                return self.hotels[index.row()].id
-            elif self.header[index.column()] == HotelTableModel.name:
-                return self.hotels[index.row()].name
-            elif self.header[index.column()] == HotelTableModel.number_of_rooms:
-                return len(self.hotels[index.row()].rooms)
-            elif self.header[index.column()] == HotelTableModel.address:
-                return f"{self.hotels[index.row()].address.street}, {self.hotels[index.row()].address.zip} {self.hotels[index.row()].address.city}"
-
-    def headerData(self, section: int, orientation: Qt.Orientation, role: int = ...):
-        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
-            return self.header[section]
+        self._search_timer.stop()
+        self.start_search()
+
+    def start_search(self):
+        if self.session_maker is None:
+            return
+        from gui.hotel_table_model import SearchWorker
+
+        if self._search_worker is not None:
+            self._search_worker.cancel()
+        self._search_generation += 1
+        query = self.hotelTableModel.search_query(self.txt_name.text())
+        self._search_worker = SearchWorker(self._search_generation, self.session_maker, query,
+                                           self.hotelTableModel.page_size)
+        self._search_worker.signals.finished.connect(self._search_finished)
+        self._search_worker.signals.failed.connect(self._search_failed)
+        self.statusBar().showMessage("Searching...")
+        self._thread_pool.start(self._search_worker)
+
+    def _search_finished(self, generation: int, query, rows: list[tuple]):
+        if generation != self._search_generation:
+            return
+        self._search_worker = None
+        self.hotelTableModel.apply_search(query, rows)
+        self.statusBar().clearMessage()
+
+    def _search_failed(self, generation: int, message: str):
+        if generation != self._search_generation:
+            return
+        self._search_worker = None
+        self.statusBar().showMessage(f"Search failed: {message}")
+
+    def closeEvent(self, event):
+        if self._search_worker is not None:
+            self._search_worker.cancel()
+        if self.session is not None:
+            self.session.close()
+        QMainWindow.closeEvent(self, event)
@@ -0,0 +1,191 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, pyqtSignal
+
+from sqlalchemy import Select, exc, func, select
+from sqlalchemy.orm import Session
+
+from data_access.fulltext import match_expression, matching_hotel_ids
+from data_access.query_stats import entry_point
+from data_models.models import *
+
+
+class SearchSignals(QObject):
+    finished = pyqtSignal(int, object, object)
+    failed = pyqtSignal(int, str)
+
+
+class SearchWorker(QRunnable):
+    '''
+    Runs the first page of a hotel search on a thread of the QThreadPool with its own session.
+    The result is sent back with the generation of the search, so the view can drop results of stale searches.
+    '''
+
+    def __init__(self, generation: int, session_maker, query: Select, page_size: int):
+        QRunnable.__init__(self)
+        self.generation = generation
+        self.signals = SearchSignals()
+        self._session_maker = session_maker
+        self._query = query
+        self._page_size = page_size
+        self._cancelled = False
+        self._dbapi_connection = None
+
+    def cancel(self):
+        self._cancelled = True
+        # aborts a query that is still running in SQLite
+        if self._dbapi_connection is not None:
+            self._dbapi_connection.interrupt()
+
+    @entry_point("SearchWorker.run")
+    def run(self):
+        try:
+            with self._session_maker() as session:
+                if self._cancelled:
+                    return
+                self._dbapi_connection = session.connection().connection.dbapi_connection
+                rows = HotelTableModel.fetch_rows(session, self._query, self._page_size)
+                self._dbapi_connection = None
+        except exc.SQLAlchemyError as err:
+            if not self._cancelled:
+                self.signals.failed.emit(self.generation, str(err))
+            return
+        if not self._cancelled:
+            self.signals.finished.emit(self.generation, self._query, rows)
+
+
+class HotelTableModel(QAbstractTableModel):
+    id = "Id"
+    name = "Name"
+    number_of_rooms = "# of rooms"
+    address = "Address"
+
+    def __init__(self, parent, session: Session | None, *args, page_size: int = 200, max_pages: int = 50) -> None:
+        QAbstractTableModel.__init__(self, parent, *args)
+        self.header = [
+            HotelTableModel.id,
+            HotelTableModel.name,
+            HotelTableModel.number_of_rooms,
+            HotelTableModel.address
+        ]
+        self.session = session
+        # Rows are fetched in pages by keyset pagination on Hotel.id while the view scrolls (canFetchMore/fetchMore).
+        # Every page is a list of precomputed tuples in header order, data() only indexes into it.
+        # At most max_pages pages stay in memory, evicted pages are fetched again by their id range.
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._query: Select = HotelTableModel.rows_query()
+        self._pages: OrderedDict[int, List[tuple]] = OrderedDict()
+        self._last_ids: List[int] = []
+        self._row_count = 0
+        self._exhausted = True
+
+    @staticmethod
+    def rows_query() -> Select:
+        # address and room count in one query instead of two lazy loads per row and repaint
+        return (
+            select(Hotel.id, Hotel.name, func.count(Room.number), Address.street, Address.zip, Address.city)
+            .join(Hotel.address)
+            .outerjoin(Hotel.rooms)
+            .group_by(Hotel.id)
+            .order_by(Hotel.id)
+        )
+
+    @staticmethod
+    def search_query(text: str) -> Select:
+        # full text search over name, address and rooms (see data_access.fulltext), rows stay ordered by id
+        query = HotelTableModel.rows_query()
+        if match_expression(text) is not None:
+            query = query.where(Hotel.id.in_(matching_hotel_ids(text)))
+        return query
+
+    @staticmethod
+    def fetch_rows(session: Session, query: Select, limit: int) -> List[tuple]:
+        return [(hotel_id, name, number_of_rooms, f"{street}, {zip_code} {city}")
+                for hotel_id, name, number_of_rooms, street, zip_code, city
+                in session.execute(query.limit(limit))]
+
+    @entry_point("HotelTableModel.all")
+    def all(self):
+        self.apply_search(HotelTableModel.rows_query())
+
+    @entry_point("HotelTableModel.search_name")
+    def search_name(self, text: str):
+        self.apply_search(HotelTableModel.search_query(text))
+
+    def apply_search(self, query: Select, first_page: List[tuple] | None = None):
+        # first_page can be fetched beforehand, e.g. by a SearchWorker
+        self.beginResetModel()
+        self._query = query
+        self._pages.clear()
+        self._last_ids = []
+        self._row_count = 0
+        self._exhausted = False
+        self._append_page(self._fetch_page(0) if first_page is None else first_page)
+        self.endResetModel()
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    @entry_point("HotelTableModel.fetchMore")
+    def fetchMore(self, parent: QModelIndex = QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        rows = self._fetch_page(len(self._last_ids))
+        if rows:
+            self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+            self._append_page(rows)
+            self.endInsertRows()
+        else:
+            self._exhausted = True
+
+    def _append_page(self, rows: List[tuple]):
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if rows:
+            self._cache_page(len(self._last_ids), rows)
+            self._last_ids.append(rows[-1][0])
+            self._row_count += len(rows)
+
+    @entry_point("HotelTableModel._fetch_page")
+    def _fetch_page(self, page: int) -> List[tuple]:
+        query = self._query
+        if page > 0:
+            query = query.where(Hotel.id > self._last_ids[page - 1])
+        if page < len(self._last_ids):
+            query = query.where(Hotel.id <= self._last_ids[page])
+        return HotelTableModel.fetch_rows(self.session, query, self.page_size)
+
+    def _page(self, page: int) -> List[tuple]:
+        rows = self._pages.get(page)
+        if rows is None:
+            rows = self._fetch_page(page)
+            self._cache_page(page, rows)
+        else:
+            self._pages.move_to_end(page)
+        return rows
+
+    def _cache_page(self, page: int, rows: List[tuple]):
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.header)
+
+    def data(self, index: QModelIndex, role: int = ...):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            page, row = divmod(index.row(), self.page_size)
+            rows = self._page(page)
+            # a page fetched again may be shorter if hotels were deleted in the meantime
+            return rows[row][index.column()] if row < len(rows) else None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = ...):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.header[section]
@@ -0,0 +1,45 @@
+# loads Qt Designer files through Python modules compiled by uic and cached in gui/__pycache__
+# uic.loadUi() imports the uic package and parses the XML on every start; the compiled module only needs
+# QtCore/QtGui/QtWidgets and is byte-compiled by the import system like every other module
+import importlib.util
+import os
+from pathlib import Path
+
+from PyQt5.QtWidgets import QWidget
+
+CACHE_DIR = Path(__file__).with_name("__pycache__")
+
+
+def load_ui(ui_file: str | os.PathLike, widget: QWidget) -> QWidget:
+    '''
+    Builds the form of ui_file on widget like uic.loadUi(): the named child widgets become attributes of widget.
+    The module is compiled again when the .ui file is newer, if the cache cannot be written uic.loadUi() is used.
+    '''
+    ui_file = Path(ui_file)
+    module_file = CACHE_DIR.joinpath(f"ui_{ui_file.stem}.py")
+    try:
+        if not module_file.is_file() or module_file.stat().st_mtime < ui_file.stat().st_mtime:
+            _compile(ui_file, module_file)
+    except OSError:
+        from PyQt5 import uic
+        return uic.loadUi(str(ui_file), widget)
+    spec = importlib.util.spec_from_file_location(f"gui.ui_{ui_file.stem}", module_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    form_class = next(value for name, value in vars(module).items() if name.startswith("Ui_"))
+    form = form_class()
+    form.setupUi(widget)
+    for name, value in vars(form).items():
+        setattr(widget, name, value)
+    return widget
+
+
+def _compile(ui_file: Path, module_file: Path):
+    from PyQt5 import uic
+
+    module_file.parent.mkdir(exist_ok=True)
+    # written to a temporary file first, a second process starting at the same time never sees half a module
+    temporary_file = module_file.with_suffix(f".{os.getpid()}.tmp")
+    with open(temporary_file, "w", encoding="utf-8") as output:
+        uic.compileUi(str(ui_file), output)
+    os.replace(temporary_file, module_file)
@@ -0,0 +1,46 @@
+import argparse
+from datetime import date
+
+import numpy as np
+
+from business.RevenueAnalytics import RevenueAnalytics
+from data_access.data_base import init_db
+from data_access.engine_factory import get_engine
+
+DB_PATH = './data/hotel_reservation.db'
+
+
+if __name__ == '__main__':
+    year = date.today().year
+    parser = argparse.ArgumentParser(description="Revenue, ADR, RevPAR, length of stay and lead time of the bookings")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=date(year, 1, 1),
+                        help="first day of the period")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=date(year + 1, 1, 1),
+                        help="day after the period")
+    parser.add_argument("--top", type=int, default=10, help="number of hotel months with the highest revenue")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    analytics = RevenueAnalytics(get_engine(args.db))
+
+    totals = analytics.totals(args.start, args.end)
+    print(f"{args.start} - {args.end}: revenue {totals['revenue']:,.2f}, occupancy {totals['occupancy']:.1%}, "
+          f"ADR {totals['adr']:,.2f}, RevPAR {totals['revpar']:,.2f}")
+
+    table = analytics.revenue_per_hotel_month(args.start, args.end)
+    print(f"\ntop {args.top} hotel months by revenue")
+    for row in table[np.argsort(table["revenue"])[::-1][:args.top]]:
+        print(f"hotel {row['hotel_id']:>6} {row['month']}: revenue {row['revenue']:>12,.2f}  "
+              f"occupancy {row['occupancy']:6.1%}  ADR {row['adr']:>9,.2f}  RevPAR {row['revpar']:>9,.2f}")
+
+    print("\nlength of stay (nights: bookings)")
+    for nights, count in enumerate(analytics.length_of_stay(args.start, args.end)):
+        if count:
+            print(f"{nights:>3}: {count}")
+
+    lead_time = analytics.lead_time(args.start, args.end)
+    print(f"\nlead time of {lead_time['bookings']} bookings: mean {lead_time['mean']:.1f} days, "
+          f"median {lead_time['median']:.0f}, 90th percentile {lead_time['p90']:.0f}")
+    for bucket, count in lead_time["buckets"].items():
+        print(f"{bucket:>8} days: {count}")
@@ -1,7 +1,7 @@
 # from search import SearchManager
 # from register import UserManager
 from data_access import data_loader as dl
-from data_access.data_base import *
+from data_access.data_base import init_db
 
 
 DB_PATH = './data/hotel_reservation.db'
@@ -0,0 +1,47 @@
+import argparse
+from datetime import date
+from pathlib import Path
+
+from data_access.data_base import init_db
+from data_access.engine_factory import get_engine
+from data_access.export import FORMATS, export_bookings, export_daily_occupancy, export_guests, export_occupancy
+
+DB_PATH = './data/hotel_reservation.db'
+EXPORTS = ("bookings", "guests", "occupancy", "daily_occupancy")
+
+
+if __name__ == '__main__':
+    year = date.today().year
+    parser = argparse.ArgumentParser(description="Export bookings, guests and occupancy per hotel or per hotel and day "
+                                                 "to CSV or Parquet")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--directory", default="./data/export")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=date(year, 1, 1),
+                        help="first day of the period (bookings starting on or after, occupancy)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=date(year + 1, 1, 1),
+                        help="day after the period")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--export", dest="exports", action="append", choices=EXPORTS,
+                        help="can be given several times, default: all")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    engine = get_engine(args.db)
+    directory = Path(args.directory)
+    period = f"{args.start}_{args.end}"
+    for name in args.exports or EXPORTS:
+        match name:
+            case "bookings":
+                result = export_bookings(engine, directory.joinpath(f"bookings_{period}.{args.format}"),
+                                         args.format, args.start, args.end, args.batch_size)
+            case "guests":
+                result = export_guests(engine, directory.joinpath(f"guests.{args.format}"), args.format,
+                                       args.batch_size)
+            case "occupancy":
+                result = export_occupancy(engine, directory.joinpath(f"occupancy_{period}.{args.format}"),
+                                          args.start, args.end, args.format, args.batch_size)
+            case "daily_occupancy":
+                result = export_daily_occupancy(engine, directory.joinpath(f"daily_occupancy_{period}.{args.format}"),
+                                                args.start, args.end, args.format, args.batch_size)
+        print(result)
@@ -1,32 +1,41 @@
-import os
+import argparse
 import sys
-from pathlib import Path
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 
-from sqlalchemy import create_engine
-
-from sqlalchemy import create_engine, func
-from sqlalchemy.schema import CreateTable
-from data_access.data_base import *
-from data_access.data_generator import *
-from gui.hotel_search import *
-
+from gui.hotel_search import HotelTableView
 
 DB_PATH = './data/hotel_reservation.db'
 
 
-
 def main():
-    init_db(DB_PATH, True, True, True)
-    engine = create_engine(f"sqlite:///{DB_PATH}")
-
-    with Session(engine) as session:
-        app = QApplication(sys.argv)
-        main_window = HotelTableView(session)
-        main_window.show()
-        sys.exit(app.exec_())
+    parser = argparse.ArgumentParser(description="hotel search")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--verbose", action="store_true",
+                        help="write the DDL file and print the example data when the database is created")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    # the window is built from the cached compiled form (gui.ui_loader) and shown first; SQLAlchemy, the models,
+    # the migration check and the first query follow once the event loop has painted it
+    main_window = HotelTableView(None)
+    main_window.statusBar().showMessage("Opening database...")
+    main_window.show()
+    QTimer.singleShot(0, lambda: open_database(main_window, args.db, args.verbose))
+    sys.exit(app.exec_())
+
+
+def open_database(main_window, db_path: str, verbose: bool):
+    from sqlalchemy.orm import sessionmaker
+
+    from data_access.data_base import init_db
+    from data_access.engine_factory import get_engine
+
+    # a current database is only checked with PRAGMA user_version, the DDL file and the example data are only
+    # written when the database is created or migrated
+    init_db(db_path, create_ddl=verbose, generate_example_data=True, verbose=verbose)
+    main_window.open(sessionmaker(bind=get_engine(db_path)))
 
 
 if __name__ == "__main__":
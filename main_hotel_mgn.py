@@ -2,7 +2,10 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.scoping import scoped_session
 
 from console.console_base import *
-from data_access.data_base import *
+from data_access.catalogue_cache import catalogue_cache
+from data_access.data_base import init_db
+from data_access.engine_factory import get_engine
+from data_access.query_stats import entry_point
 from data_models.models import *
 
 
@@ -10,12 +13,14 @@ class HotelManager(object):
     def __init__(self, session_maker):
         self._session = scoped_session(session_maker)
 
+    @entry_point("HotelManager.show_all_hotels")
     def show_all_hotels(self):
-        hotels = self._session.query(Hotel).all()
+        hotels = catalogue_cache.hotels(self._session)
         for hotel in hotels:
             print(hotel)
         input("Press Enter to continue...")
 
+    @entry_point("HotelManager.create_new_hotel")
     def create_new_hotel(self):
         Console.clear()
         print("Creating new Hotel")
@@ -39,6 +44,7 @@ class HotelManager(object):
             case "y":
                 self._session.add(new_hotel)
                 self._session.commit()
+                catalogue_cache.invalidate()
                 print("Saved!")
                 input("Press Enter to continue...")
             case "n":
@@ -87,14 +93,11 @@ class MainMenu(Menu):
 
 if __name__ == '__main__':
     DB_FILE = './data/hotel_reservation.db'
-    ALWAYS_CREATE_NEW_DB = True
+    ALWAYS_CREATE_NEW_DB = False
     TEST_DATA = True
-    if ALWAYS_CREATE_NEW_DB:
-        init_db(DB_FILE, generate_example_data=TEST_DATA)
-    else:
-        if not os.path.exists(DB_FILE):
-            init_db(DB_FILE, generate_example_data=TEST_DATA)
-    engine = create_engine(f'sqlite:///{DB_FILE}', echo=False)
+    # migrates an existing database and keeps its data, unless a new one is forced
+    init_db(DB_FILE, generate_example_data=TEST_DATA, reset=ALWAYS_CREATE_NEW_DB)
+    engine = get_engine(DB_FILE)
     session_factory = sessionmaker(bind=engine)
     app = Application(MainMenu())
     app.run()
@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+
+from api.http_service import BookingHttpService
+from business.AsyncHotelService import AsyncHotelService
+from data_access.data_base import init_db
+from data_access.engine_factory import dispose_async_engines, get_async_engine
+from data_access.query_stats import instrument
+
+DB_PATH = './data/hotel_reservation.db'
+
+
+async def serve(db_path: str, host: str, port: int):
+    engine = get_async_engine(db_path)
+    # statistics for GET /metrics
+    instrument(engine.sync_engine)
+    service = BookingHttpService(AsyncHotelService(engine), engine)
+    print(f"Serving {db_path} on http://{host}:{port}")
+    try:
+        await service.serve_forever(host, port)
+    finally:
+        await dispose_async_engines()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="HTTP/JSON service for hotel search, availability and bookings")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--example-data", action="store_true", help="fill a new database with example data")
+    args = parser.parse_args()
+
+    # migrates an existing database and keeps its data
+    init_db(args.db, generate_example_data=args.example_data)
+    try:
+        asyncio.run(serve(args.db, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
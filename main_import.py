@@ -0,0 +1,25 @@
+import argparse
+
+from data_access.data_base import init_db
+from data_access.engine_factory import get_engine
+from data_access.importer import FORMATS, Importer
+
+DB_PATH = './data/hotel_reservation.db'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import hotels with rooms or guests from CSV or JSON lines files")
+    parser.add_argument("kind", choices=("hotels", "guests"))
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="records per transaction")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    importer = Importer(get_engine(args.db), args.chunk_size)
+    for file in args.files:
+        if args.kind == "hotels":
+            print(importer.import_hotels(file, args.format))
+        else:
+            print(importer.import_guests(file, args.format))
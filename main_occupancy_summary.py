@@ -0,0 +1,25 @@
+import argparse
+import time
+from datetime import date
+
+from data_access.data_base import init_db
+from data_access.engine_factory import get_engine
+from data_access.occupancy_summary import rebuild_occupancy_summary
+
+DB_PATH = './data/hotel_reservation.db'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild the per hotel and day occupancy summary from the bookings, "
+                                                 "e.g. after a backfill of bookings with the triggers suspended")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--from", dest="start", type=date.fromisoformat,
+                        help="first day to rebuild, default: all days")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="day after the last day to rebuild")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    started = time.perf_counter()
+    with get_engine(args.db).begin() as connection:
+        rows = rebuild_occupancy_summary(connection, args.start, args.end)
+    print(f"{rows} hotel days rebuilt in {time.perf_counter() - started:.2f}s")